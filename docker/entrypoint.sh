@@ -6,5 +6,8 @@ python manage.py migrate --noinput
 # Create test users
 python manage.py create_test_users
 
-# Start server
-exec python manage.py runserver 0.0.0.0:8000
+# Resume ticket images left in processing state by a previous run
+python manage.py process_pending_images
+
+# Start the pre-forking server (reload the code with: kill -HUP 1)
+exec python manage.py serve --bind 0.0.0.0:8000
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Subscription
+
+
+class FollowGraph:
+    """
+    Cache of the follow graph, read instead of the Subscription table.
+
+    For each user, two entries are cached on first read:
+        - following: the ids of the users they follow, with the id of the matching subscription,
+        - followers: the ids of the users following them.
+
+    Entries are invalidated by the Subscription signals (see feed.signals), so they are
+    refreshed after User.follow() / User.unfollow() as well as after the subscription views.
+    They are read from the primary database, a lagging replica would have them cached stale.
+    """
+
+    @staticmethod
+    def _following_key(user_id: int) -> str:
+        return f"follow_graph:following:{user_id}"
+
+    @staticmethod
+    def _followers_key(user_id: int) -> str:
+        return f"follow_graph:followers:{user_id}"
+
+    @staticmethod
+    def following(user_id: int) -> dict[int, int]:
+        """Subscriptions of a user: the id of each subscription, by id of the followed user."""
+        key = FollowGraph._following_key(user_id)
+        following = cache.get(key)
+        if following is None:
+            following = dict(
+                Subscription.objects.using(DEFAULT_DB_ALIAS)
+                .filter(follower_id=user_id)
+                .values_list("followed_id", "id")
+            )
+            cache.set(key, following, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+        return following
+
+    @staticmethod
+    async def afollowing(user_id: int) -> dict[int, int]:
+        """Async version of following(), for async views."""
+        key = FollowGraph._following_key(user_id)
+        following = await cache.aget(key)
+        if following is None:
+            following = {
+                followed_id: subscription_id
+                async for followed_id, subscription_id in Subscription.objects.using(DEFAULT_DB_ALIAS)
+                .filter(follower_id=user_id)
+                .values_list("followed_id", "id")
+            }
+            await cache.aset(key, following, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+        return following
+
+    @staticmethod
+    def followed_ids(user_id: int) -> frozenset[int]:
+        """Ids of the users followed by a user."""
+        return frozenset(FollowGraph.following(user_id))
+
+    @staticmethod
+    def followers_ids(user_id: int) -> frozenset[int]:
+        """Ids of the users following a user."""
+        key = FollowGraph._followers_key(user_id)
+        followers_ids = cache.get(key)
+        if followers_ids is None:
+            followers_ids = frozenset(
+                Subscription.objects.using(DEFAULT_DB_ALIAS)
+                .filter(followed_id=user_id)
+                .values_list("follower_id", flat=True)
+            )
+            cache.set(key, followers_ids, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+        return followers_ids
+
+    @staticmethod
+    async def afollowers_ids(user_id: int) -> frozenset[int]:
+        """Async version of followers_ids(), for async views."""
+        key = FollowGraph._followers_key(user_id)
+        followers_ids = await cache.aget(key)
+        if followers_ids is None:
+            followers_ids = frozenset(
+                [
+                    follower_id
+                    async for follower_id in Subscription.objects.using(DEFAULT_DB_ALIAS)
+                    .filter(followed_id=user_id)
+                    .values_list("follower_id", flat=True)
+                ]
+            )
+            await cache.aset(key, followers_ids, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+        return followers_ids
+
+    @staticmethod
+    def invalidate(follower_id: int, followed_id: int):
+        """
+        Drop the cached entries changed by a subscription of follower to followed.
+
+        They are dropped right away and again once the transaction is committed: a request reading
+        the graph in between would otherwise cache the state from before the change.
+        """
+        keys = [FollowGraph._following_key(follower_id), FollowGraph._followers_key(followed_id)]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import path
+
+from feed import views
+from feed.management.commands import benchmark_feed
+from litrevu import urls as litrevu_urls
+from users.models import User
+
+
+# the sync and async versions of each view, served side by side by the urlconf of this module
+VIEWS = {
+    "feed": (views.FeedPostsView, views.AsyncFeedPostsView),
+    "user_posts": (views.UserPostsView, views.AsyncUserPostsView),
+    "subscriptions": (views.SubscriptionLandingView, views.AsyncSubscriptionLandingView),
+}
+
+urlpatterns = [
+    *(path(f"benchmark/sync/{view}/", sync_view.as_view()) for view, (sync_view, _) in VIEWS.items()),
+    *(path(f"benchmark/async/{view}/", async_view.as_view()) for view, (_, async_view) in VIEWS.items()),
+    # the views' templates link to the pages of the site
+    *litrevu_urls.urlpatterns,
+]
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+async def read_content(response) -> bytes:
+    """Read the whole content of a response, streamed or not, as an ASGI server would."""
+    if not response.streaming:
+        return response.content
+    if response.is_async:
+        return b"".join([chunk async for chunk in response.streaming_content])
+    # the sync views stream their page with a sync iterator, which queries the database: it is read in a thread
+    return await sync_to_async(b"".join)(response.streaming_content)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the requests per second and the latencies of the sync and async versions of the feed, user posts "
+        "and subscriptions views, under concurrent load through Django's ASGI handler, in a temporary database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int_list, default=[1, 10, 50], help="Numbers of concurrent clients, comma separated"
+        )
+        parser.add_argument("--duration", type=float, default=5, help="Duration of each run, in seconds")
+        parser.add_argument("--followed", type=int, default=100, help="Number of users followed by the viewer")
+        parser.add_argument("--posts-per-user", type=int, default=20, help="Number of tickets by user")
+        parser.add_argument("--review-ratio", type=float, default=0.5, help="Share of tickets with a review")
+        parser.add_argument("--views", default=",".join(VIEWS), help=f"Views to benchmark among {', '.join(VIEWS)}")
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random generator, for reproducible data")
+
+    def handle(self, *args, **options):
+        views_names = options["views"].split(",")
+        if unknown_views := set(views_names) - set(VIEWS):
+            raise CommandError(f"Unknown views: {', '.join(sorted(unknown_views))}")
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            # a database file, so the threads of the sync views and of the async ORM share it
+            connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark_async.sqlite3")
+            old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                dataset_builder = benchmark_feed.Command()
+                dataset_builder.rng = random.Random(options["seed"])
+                viewer = dataset_builder.build_dataset(
+                    options["followed"], options["posts_per_user"], options["review_ratio"]
+                )
+                # closed, so the async code does not share the connection of the main thread
+                connection.close()
+
+                with override_settings(ROOT_URLCONF=__name__):
+                    for view in views_names:
+                        for concurrency in options["concurrency"]:
+                            for mode in ("sync", "async"):
+                                result = asyncio.run(
+                                    self.load(f"/benchmark/{mode}/{view}/", viewer, concurrency, options["duration"])
+                                )
+                                self.stdout.write(
+                                    f"{view:<14} {mode:<6} clients={concurrency:<4} "
+                                    f"rps={result['rps']:>7.1f} p50={result['p50_ms']:>8.1f}ms "
+                                    f"p99={result['p99_ms']:>8.1f}ms errors={result['errors']}"
+                                )
+            finally:
+                connection.creation.destroy_test_db(old_database_name, verbosity=0)
+                teardown_test_environment()
+
+    async def load(self, url: str, viewer: User, concurrency: int, duration: float) -> dict:
+        """Request url from concurrent clients, each one sending its next request once the previous one is read."""
+        latencies = []
+        errors = 0
+
+        async def client_loop(client: AsyncClient, deadline: float):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(url)
+                await read_content(response)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        clients = []
+        for _ in range(concurrency):
+            client = AsyncClient()
+            await client.aforce_login(viewer)
+            clients.append(client)
+        # warm up: imports, compiled templates, cached follow graph
+        await client_loop(clients[0], time.perf_counter())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, start + duration) for client in clients))
+        elapsed = time.perf_counter() - start
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            "rps": len(latencies) / elapsed,
+            "p50_ms": quantiles[49] * 1000,
+            "p99_ms": quantiles[98] * 1000,
+            "errors": errors,
+        }
@@ -0,0 +1,307 @@
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.utils import CursorDebugWrapper
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from feed.models import Subscription
+from feed.timeline import TimelineService
+from reviews.models import Review
+from tickets.models import Ticket
+from users.management.commands.seed_load import explicit_timestamps
+from users.models import User
+
+
+# benchmarked views: url and settings overridden during the requests
+VIEWS = {
+    "feed": ("/feed/", {"FEED_MATERIALIZED_TIMELINE": True}),
+    "feed_union": ("/feed/", {"FEED_MATERIALIZED_TIMELINE": False}),
+    "user_posts": ("/feed/user_posts/", {}),
+    "subscriptions": ("/feed/subscription/", {}),
+}
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def float_list(value: str) -> list[float]:
+    return [float(item) for item in value.split(",")]
+
+
+def result_key(result: dict) -> tuple:
+    """Identify a result by its view and its dataset, to compare runs."""
+    return result["view"], result["followed"], result["posts_per_user"], result["review_ratio"]
+
+
+class RowCountingCursorWrapper(CursorDebugWrapper):
+    """Debug cursor counting the rows fetched from the database, whatever the fetch method used."""
+
+    rows_fetched = 0
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            RowCountingCursorWrapper.rows_fetched += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self.cursor.fetchmany(size) if size is not None else self.cursor.fetchmany()
+        RowCountingCursorWrapper.rows_fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        RowCountingCursorWrapper.rows_fetched += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self.cursor:
+            RowCountingCursorWrapper.rows_fetched += 1
+            yield row
+
+
+@contextmanager
+def count_fetched_rows():
+    """Count the rows fetched by the default connection, read from the yielded dict once the block is done."""
+    result = {}
+    make_debug_cursor = connection.make_debug_cursor
+    connection.make_debug_cursor = lambda cursor: RowCountingCursorWrapper(cursor, connection)
+    RowCountingCursorWrapper.rows_fetched = 0
+    try:
+        # CaptureQueriesContext forces the debug cursor, and counts queries
+        with CaptureQueriesContext(connection) as queries:
+            yield result
+    finally:
+        connection.make_debug_cursor = make_debug_cursor
+        result["queries"] = len(queries)
+        result["rows_fetched"] = RowCountingCursorWrapper.rows_fetched
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the feed, user posts and subscriptions views on datasets of increasing size, "
+        "in a temporary test database, and write the results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--followed", type=int_list, default=[10, 100, 500], help="Numbers of users followed, comma separated"
+        )
+        parser.add_argument(
+            "--posts-per-user", type=int_list, default=[10, 50], help="Numbers of tickets by user, comma separated"
+        )
+        parser.add_argument(
+            "--review-ratio",
+            type=float_list,
+            default=[0.0, 0.5],
+            help="Shares of tickets with a review (a ticket has one review at most), comma separated",
+        )
+        parser.add_argument("--views", default=",".join(VIEWS), help=f"Views to benchmark among {', '.join(VIEWS)}")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of timed requests by view and dataset")
+        parser.add_argument("--warm-cache", action="store_true", help="Keep the cache between timed requests")
+        parser.add_argument("--output", default="benchmark_feed.json", help="File the JSON results are written to")
+        parser.add_argument("--compare", help="Previous results file, to report the regressions")
+        parser.add_argument(
+            "--threshold", type=float, default=1.2, help="Time ratio over which a result is reported as a regression"
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random generator, for reproducible data")
+
+    def handle(self, *args, **options):
+        views = options["views"].split(",")
+        if unknown_views := set(views) - set(VIEWS):
+            raise CommandError(f"Unknown views: {', '.join(sorted(unknown_views))}")
+
+        self.rng = random.Random(options["seed"])
+        results = []
+
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for followed, posts_per_user, review_ratio in itertools.product(
+                options["followed"], options["posts_per_user"], options["review_ratio"]
+            ):
+                dataset = {"followed": followed, "posts_per_user": posts_per_user, "review_ratio": review_ratio}
+                viewer = self.build_dataset(**dataset)
+
+                for view in views:
+                    result = {"view": view, **dataset, **self.measure(viewer, view, options)}
+                    results.append(result)
+                    self.stdout.write(
+                        f"{view:<14} followed={followed:<6} posts={posts_per_user:<5} reviews={review_ratio:<5} "
+                        f"median={result['wall_time_ms']['median']:>8.1f}ms queries={result['queries']:<4} "
+                        f"rows={result['rows_fetched']:<7} memory={result['peak_memory_kb']}kB"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "commit": self.current_commit(),
+            "date": timezone.now().isoformat(),
+            "repeat": options["repeat"],
+            "warm_cache": options["warm_cache"],
+            "results": results,
+        }
+        Path(options["output"]).write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} results written to {options['output']}"))
+
+        if options["compare"]:
+            self.compare(results, options["compare"], options["threshold"])
+
+    def build_dataset(self, followed: int, posts_per_user: int, review_ratio: float) -> User:
+        """
+        Replace the database content by a viewer following (and followed by) followed users.
+        Every user, the viewer included, has posts_per_user tickets, a review_ratio share of them
+        being reviewed by a followed user.
+        """
+        call_command("flush", interactive=False, verbosity=0)
+
+        viewer = User.objects.create(username="viewer")
+        users = User.objects.bulk_create(User(username=f"user_{number}") for number in range(followed))
+        Subscription.objects.bulk_create(
+            [Subscription(follower=viewer, followed=user) for user in users]
+            + [Subscription(follower=user, followed=viewer) for user in users]
+        )
+
+        now = timezone.now()
+        timestamps = [
+            model._meta.get_field(name) for model in (Ticket, Review) for name in ("time_created", "time_edited")
+        ]
+        with explicit_timestamps(*timestamps):
+            tickets = []
+            for user in [viewer, *users]:
+                for number in range(posts_per_user):
+                    time_created = now - timedelta(minutes=self.rng.randrange(60 * 24 * 365))
+                    tickets.append(
+                        Ticket(
+                            user=user,
+                            title=f"Ticket {number} of {user.username}",
+                            content="content " * 50,
+                            time_created=time_created,
+                            time_edited=time_created,
+                        )
+                    )
+            tickets = Ticket.objects.bulk_create(tickets, batch_size=5000)
+
+            reviews = []
+            for ticket in tickets:
+                reviewer = self.rng.choice(users) if users else None
+                if reviewer and reviewer.id != ticket.user_id and self.rng.random() < review_ratio:
+                    time_created = ticket.time_created + timedelta(minutes=self.rng.randrange(60 * 24))
+                    reviews.append(
+                        Review(
+                            user=reviewer,
+                            ticket=ticket,
+                            title=f"Review of {ticket.title}",
+                            rating=self.rng.randint(0, 5),
+                            content="review " * 50,
+                            time_created=time_created,
+                            time_edited=time_created,
+                        )
+                    )
+            Review.objects.bulk_create(reviews, batch_size=5000)
+
+        # bulk_create does not send signals, the derived data is rebuilt
+        TimelineService.rebuild()
+        User.objects.recount_follows()
+        cache.clear()
+        return viewer
+
+    def request(self, client: Client, url: str) -> int:
+        """Request url and read the whole response, streamed or not, return its size."""
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"{url} answered {response.status_code}")
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return len(content)
+
+    def measure(self, viewer: User, view: str, options: dict) -> dict:
+        url, view_settings = VIEWS[view]
+        client = Client()
+        client.force_login(viewer)
+
+        with override_settings(**view_settings):
+            # warm up: imports, compiled templates, session
+            self.request(client, url)
+
+            wall_times = []
+            for _ in range(options["repeat"]):
+                if not options["warm_cache"]:
+                    cache.clear()
+                start = time.perf_counter()
+                self.request(client, url)
+                wall_times.append((time.perf_counter() - start) * 1000)
+
+            # queries, rows and memory are measured on a separate request, tracing slows it down
+            if not options["warm_cache"]:
+                cache.clear()
+            tracemalloc.start()
+            with count_fetched_rows() as counts:
+                response_size = self.request(client, url)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return {
+            "wall_time_ms": {
+                "min": round(min(wall_times), 2),
+                "median": round(statistics.median(wall_times), 2),
+                "max": round(max(wall_times), 2),
+            },
+            "queries": counts["queries"],
+            "rows_fetched": counts["rows_fetched"],
+            "peak_memory_kb": peak_memory // 1024,
+            "response_bytes": response_size,
+        }
+
+    def current_commit(self) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, results: list[dict], previous_file: str, threshold: float):
+        """Report the results whose median time grew by more than threshold since the previous run."""
+        previous_report = json.loads(Path(previous_file).read_text())
+        previous_results = {result_key(result): result for result in previous_report["results"]}
+
+        regressions = 0
+        for result in results:
+            previous = previous_results.get(result_key(result))
+            if previous is None:
+                continue
+
+            ratio = result["wall_time_ms"]["median"] / max(previous["wall_time_ms"]["median"], 0.001)
+            queries_delta = result["queries"] - previous["queries"]
+            if ratio > threshold or queries_delta > 0:
+                regressions += 1
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Regression {result['view']} followed={result['followed']} "
+                        f"posts={result['posts_per_user']} reviews={result['review_ratio']}: "
+                        f"time x{ratio:.2f}, queries {queries_delta:+d}"
+                    )
+                )
+
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"{regressions} regressions since {previous_file}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No regression since {previous_file}"))
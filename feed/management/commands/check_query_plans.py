@@ -0,0 +1,102 @@
+import re
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from feed.management.commands.benchmark_feed import VIEWS
+from feed.services import REVIEW, FeedCursor
+from reviews.models import Review
+from tickets.models import Ticket
+from users.models import User
+
+
+# plan steps reading a whole table or sorting the whole result. "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY" is
+# accepted: rows come ordered on time_created from the index, only the rows with the same time_created are sorted
+FULL_SCAN = re.compile(r"^SCAN (?!\(|CONSTANT ROW)(?P<table>\S+)")
+FULL_SORT = re.compile(r"^USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)$")
+
+# full sorts accepted in the compound (UNION ALL) query of a view, with the reason
+ACCEPTED_SORTS = {
+    # posts of several users (user_id IN (...)) come from several ranges of the index, they have to be merged:
+    # the materialized timeline ("feed" view) is the sort-free access path of the feed
+    "feed_union": "posts of the followed users are merged",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the feed views on a small dataset in a temporary test database, and check the plan "
+        "(EXPLAIN QUERY PLAN) of every query they run: fail if a query scans a whole table or sorts its result"
+    )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            viewer = self.build_dataset()
+            failures = []
+            for view, (url, view_settings) in VIEWS.items():
+                # the first page, then a next page, whose queries carry the keyset conditions
+                next_page = FeedCursor(timezone.now(), REVIEW, 10**9).encode()
+                for page_url in (url, f"{url}?cursor={next_page}"):
+                    failures.extend(self.check_view(view, page_url, view_settings, viewer, options["verbosity"]))
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f"{len(failures)} queries with a full scan or a full sort")
+        self.stdout.write(self.style.SUCCESS("Every query plan uses indexes, without full scan nor full sort"))
+
+    def build_dataset(self) -> User:
+        """A viewer following a few users, who all post tickets and reviews, and whose tickets are reviewed."""
+        viewer, *followed = (User.objects.create(username=f"user_{number}") for number in range(4))
+        stranger = User.objects.create(username="stranger")
+        for user in followed:
+            viewer.follow(user)
+            user.follow(viewer)
+
+        for user in [viewer, *followed, stranger]:
+            for number in range(3):
+                ticket = Ticket.objects.create(user=user, title=f"Ticket {number} of {user}")
+                reviewer = stranger if user == viewer else viewer
+                Review.objects.create(user=reviewer, ticket=ticket, title=f"Review of {ticket}", rating=3)
+        return viewer
+
+    def check_view(self, view: str, url: str, view_settings: dict, viewer: User, verbosity: int) -> list[str]:
+        client = Client()
+        client.force_login(viewer)
+        # the cached data (follow graph, fragments) is read from the database
+        cache.clear()
+
+        with override_settings(**view_settings), CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f"{url} answered {response.status_code}")
+
+        failures = []
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[3] for row in cursor.fetchall()]
+
+            for step in plan:
+                if FULL_SCAN.match(step):
+                    failures.append(f"{view} {url}: full scan ({step})\n    {sql}")
+                elif FULL_SORT.match(step) and not (view in ACCEPTED_SORTS and "UNION ALL" in sql):
+                    failures.append(f"{view} {url}: full sort ({step})\n    {sql}")
+
+            if verbosity >= 2:
+                self.stdout.write(f"{view} {url}\n    {sql}\n" + "".join(f"      {step}\n" for step in plan))
+
+        self.stdout.write(f"{view:<14} {url[:40]:<40} {len(queries)} queries checked")
+        return failures
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feed.suggestions import SuggestionService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "who to follow" suggestions of every user from the follow graph and the reviews'
+
+    def handle(self, *args, **options):
+        created = SuggestionService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{created} follow suggestions computed"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feed.timeline import TimelineService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized timelines (feed entries) from scratch"
+
+    def handle(self, *args, **options):
+        created = TimelineService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Timelines rebuilt with {created} entries"))
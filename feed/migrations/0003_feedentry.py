@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    """Create the timelines of the existing tickets and reviews."""
+    FeedEntry = apps.get_model("feed", "FeedEntry")
+    Subscription = apps.get_model("feed", "Subscription")
+    Ticket = apps.get_model("tickets", "Ticket")
+    Review = apps.get_model("reviews", "Review")
+
+    followers_by_user = {}
+    for follower_id, followed_id in Subscription.objects.values_list("follower_id", "followed_id"):
+        followers_by_user.setdefault(followed_id, []).append(follower_id)
+
+    entries = []
+    for ticket_id, user_id, time_created in Ticket.objects.values_list("id", "user_id", "time_created"):
+        for owner_id in {user_id, *followers_by_user.get(user_id, [])}:
+            entries.append(FeedEntry(owner_id=owner_id, author_id=user_id, kind="ticket", post_id=ticket_id, time_created=time_created))
+
+    for review_id, user_id, ticket_user_id, time_created in Review.objects.values_list("id", "user_id", "ticket__user_id", "time_created"):
+        for owner_id in {user_id, ticket_user_id, *followers_by_user.get(user_id, [])}:
+            entries.append(FeedEntry(owner_id=owner_id, author_id=user_id, kind="review", post_id=review_id, time_created=time_created))
+
+    FeedEntry.objects.bulk_create(entries, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0002_initial'),
+        ('reviews', '0001_initial'),
+        ('tickets', '0004_alter_ticket_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ticket', 'Ticket'), ('review', 'Review')], max_length=6, verbose_name='Kind')),
+                ('post_id', models.PositiveBigIntegerField(verbose_name='Post id')),
+                ('time_created', models.DateTimeField(verbose_name='Created the')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feed entry',
+                'verbose_name_plural': 'Feed entries',
+                'ordering': ['-time_created', '-kind', '-post_id'],
+                'indexes': [models.Index(fields=['owner', '-time_created', '-kind', '-post_id'], name='feed_entry_timeline_idx'), models.Index(fields=['kind', 'post_id'], name='feed_entry_post_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'kind', 'post_id'), name='unique_feed_entry')],
+            },
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0004_subscription_subscription_followers_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('mutual_follows', models.PositiveIntegerField(default=0, verbose_name='Mutual follows')),
+                ('shared_reviews', models.PositiveIntegerField(default=0, verbose_name='Shared reviews')),
+                ('suggested', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follow_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Follow suggestion',
+                'verbose_name_plural': 'Follow suggestions',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['user', '-score'], name='follow_suggestion_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'suggested'), name='unique_follow_suggestion')],
+            },
+        ),
+    ]
@@ -25,6 +25,96 @@ class Subscription(models.Model):
     # this unique constraint ensure that a user can't follow twice the same user'
     class Meta:
         unique_together = ("follower", "followed")
+        indexes = [
+            # reverse of the unique_together index: the followers of a user, read from the index only
+            models.Index(fields=["followed", "follower"], name="subscription_followers_idx"),
+        ]
 
     def __str__(self):
         return f"{self.follower} is following {self.followed}"
+
+
+class FeedEntry(models.Model):
+    """
+    Materialized timeline: one row per post visible in the feed of a user.
+
+    Entries are written when a post is published (fan-out on write) or when a user follows someone,
+    so reading a feed is a single range scan on (owner, time_created).
+
+    :ivar owner: The user whose feed contains the post.
+    :type owner: ForeignKey
+    :ivar author: The user who published the post.
+    :type author: ForeignKey
+    :ivar kind: The kind of post, ticket or review.
+    :type kind: str
+    :ivar post_id: The id of the Ticket or Review instance.
+    :type post_id: int
+    :ivar time_created: The creation time of the post, copied from it to sort the feed.
+    :type time_created: datetime
+    """
+
+    class Kind(models.TextChoices):
+        TICKET = "ticket", "Ticket"
+        REVIEW = "review", "Review"
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="feed_entries")
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField("Kind", max_length=6, choices=Kind.choices)
+    post_id = models.PositiveBigIntegerField("Post id")
+    time_created = models.DateTimeField("Created the")
+
+    class Meta:
+        ordering = ["-time_created", "-kind", "-post_id"]
+        verbose_name = "Feed entry"
+        verbose_name_plural = "Feed entries"
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "kind", "post_id"], name="unique_feed_entry"),
+        ]
+        indexes = [
+            # matches the feed ordering so a page is read straight from the index
+            models.Index(fields=["owner", "-time_created", "-kind", "-post_id"], name="feed_entry_timeline_idx"),
+            # used to remove a post from every feed when it is deleted
+            models.Index(fields=["kind", "post_id"], name="feed_entry_post_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.post_id} in the feed of {self.owner}"
+
+
+class FollowSuggestion(models.Model):
+    """
+    Precomputed "who to follow" recommendation, rebuilt in batch by the compute_follow_suggestions command
+    (see feed.suggestions.SuggestionService), so the subscriptions page reads the best ones with one indexed query.
+
+    :ivar user: The user the account is suggested to.
+    :type user: ForeignKey
+    :ivar suggested: The suggested account, not followed by user when the suggestions were computed.
+    :type suggested: ForeignKey
+    :ivar score: The relevance of the suggestion, higher is better.
+    :type score: float
+    :ivar mutual_follows: The number of users followed by user who follow the suggested account.
+    :type mutual_follows: int
+    :ivar shared_reviews: The number of reviews exchanged between the two users, on each other's tickets.
+    :type shared_reviews: int
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="follow_suggestions")
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField("Score")
+    mutual_follows = models.PositiveIntegerField("Mutual follows", default=0)
+    shared_reviews = models.PositiveIntegerField("Shared reviews", default=0)
+
+    class Meta:
+        ordering = ["-score"]
+        verbose_name = "Follow suggestion"
+        verbose_name_plural = "Follow suggestions"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "suggested"], name="unique_follow_suggestion"),
+        ]
+        indexes = [
+            # the best suggestions of a user, read from the index without sorting
+            models.Index(fields=["user", "-score"], name="follow_suggestion_top_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.suggested} suggested to {self.user}"
@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import binascii
+import logging
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import CharField, F, Q, QuerySet, Value
+
+from reviews.models import Review
+from tickets.models import Ticket
+
+from .follow_graph import FollowGraph
+from .models import FeedEntry
+from .timeline import TimelineService
+
+
+logger = logging.getLogger("feed")
+
+TICKET = FeedEntry.Kind.TICKET.value
+REVIEW = FeedEntry.Kind.REVIEW.value
+
+# total order of the feed: newest first, ties broken by kind then by id
+FEED_ORDERING = ("-time_created", "-kind", "-post_id")
+
+
+@dataclass(frozen=True)
+class FeedCursor:
+    """
+    Position of the last post displayed on a feed page.
+
+    The feed is ordered on (time_created, kind, post_id), which is a total order,
+    so the next page is simply every row strictly "older" than this cursor.
+    """
+
+    time_created: datetime
+    kind: str
+    post_id: int
+
+    def encode(self) -> str:
+        raw = f"{self.time_created.isoformat()}|{self.kind}|{self.post_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str | None) -> "FeedCursor | None":
+        """Return the cursor encoded in token, or None if token is missing or invalid."""
+        if not token:
+            return None
+
+        try:
+            time_created, kind, post_id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+            cursor = cls(datetime.fromisoformat(time_created), kind, int(post_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+            logger.warning(f"Invalid feed cursor {token!r}: {error}")
+            return None
+
+        if cursor.kind not in (TICKET, REVIEW):
+            return None
+
+        return cursor
+
+    @classmethod
+    def from_row(cls, row: dict) -> "FeedCursor":
+        return cls(row["time_created"], row["kind"], row["post_id"])
+
+
+class FeedPage:
+    """
+    One page of a feed.
+
+    Only the (kind, post_id, time_created) rows of the page are fetched from the database, lazily and
+    chunk by chunk, then the matching Ticket and Review instances of each chunk are loaded (hydrated)
+    with one query per kind. Iterating over a page yields the hydrated posts in feed order, so a
+    template can render the first posts while the next ones are still being fetched.
+
+    has_next and next_cursor are known once the page has been iterated.
+
+    Async views load the whole page beforehand with aload(), iterating then yields the loaded posts.
+    """
+
+    def __init__(self, rows: QuerySet, page_size: int, chunk_size: int | None = None):
+        # fetch one extra row to know if there is a next page without running a COUNT(*)
+        self.rows = rows[: page_size + 1]
+        self.page_size = page_size
+        self.chunk_size = chunk_size or page_size
+        self.has_next = False
+        self.next_cursor = None
+        self.posts = None
+
+    async def aload(self) -> "FeedPage":
+        """Fetch the rows of the page and hydrate them with the async ORM."""
+        rows = [row async for row in self.rows.aiterator(chunk_size=self.page_size + 1)]
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            self.has_next = True
+            self.next_cursor = FeedCursor.from_row(rows[-1]).encode()
+
+        self.posts = await FeedService.ahydrate(rows)
+        return self
+
+    def _chunks(self):
+        chunk = []
+        last_row = None
+        for position, row in enumerate(self.rows.iterator(chunk_size=self.chunk_size)):
+            if position == self.page_size:
+                self.has_next = True
+                self.next_cursor = FeedCursor.from_row(last_row).encode()
+                break
+
+            last_row = row
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    def __iter__(self):
+        if self.posts is not None:
+            yield from self.posts
+            return
+
+        for chunk in self._chunks():
+            yield from FeedService.hydrate(chunk)
+
+
+class FeedService:
+    """
+    Service class building users' feeds.
+
+    Tickets and Reviews are merged in the database with a UNION ALL of (kind, post_id, time_created)
+    tuples, ordered and paginated with a cursor (keyset pagination), so the cost of a page does not
+    depend on the size of the history.
+    """
+
+    @staticmethod
+    def keyset_filter(cursor: FeedCursor | None, kind: str | None = None, id_field: str = "id") -> Q:
+        """
+        Build the filter selecting the rows placed after cursor in feed order.
+
+        When kind is given, it is a constant of the queried rows (one branch of the union): the comparison
+        on kind is solved here and only the conditions on time_created and id are sent to the database.
+        Otherwise, kind is read from the "kind" column of the rows (materialized timeline).
+        """
+        if cursor is None:
+            return Q()
+
+        older = Q(time_created__lt=cursor.time_created)
+        same_time = Q(time_created=cursor.time_created)
+        lower_id = Q(**{f"{id_field}__lt": cursor.post_id})
+
+        if kind is None:
+            return older | (same_time & Q(kind__lt=cursor.kind)) | (same_time & Q(kind=cursor.kind) & lower_id)
+        if kind < cursor.kind:
+            return older | same_time
+        if kind == cursor.kind:
+            return older | (same_time & lower_id)
+        return older
+
+    @staticmethod
+    def _rows(queryset: QuerySet, kind: str, cursor: FeedCursor | None) -> QuerySet:
+        """Reduce a Ticket or Review queryset to (kind, post_id, time_created) rows."""
+        return (
+            queryset.filter(FeedService.keyset_filter(cursor, kind))
+            # ordering is not allowed in subqueries of a compound statement
+            .order_by()
+            .annotate(kind=Value(kind, output_field=CharField()), post_id=F("id"))
+            .values("kind", "post_id", "time_created")
+        )
+
+    @staticmethod
+    def merge(tickets: QuerySet, reviews: QuerySet, cursor: FeedCursor | None) -> QuerySet:
+        """Merge tickets and reviews in a single ordered queryset of rows."""
+        return (
+            FeedService._rows(tickets, TICKET, cursor)
+            .union(FeedService._rows(reviews, REVIEW, cursor), all=True)
+            .order_by(*FEED_ORDERING)
+        )
+
+    @staticmethod
+    def feed_rows(user, cursor: FeedCursor | None = None) -> QuerySet:
+        """
+        Rows of the feed of a user:
+            - tickets and reviews of the user and of the users they follow,
+            - reviews in response to the user's tickets, even if the reviewer is not followed.
+        """
+        return FeedService._feed_rows(user, FollowGraph.followed_ids(user.id), cursor)
+
+    @staticmethod
+    async def afeed_rows(user, cursor: FeedCursor | None = None) -> QuerySet:
+        """Async version of feed_rows(), the follow graph being read with the async cache and ORM."""
+        return FeedService._feed_rows(user, await FollowGraph.afollowing(user.id), cursor)
+
+    @staticmethod
+    def _feed_rows(user, followed_ids: Iterable[int], cursor: FeedCursor | None) -> QuerySet:
+        users_ids_to_get_posts_from = [user.id, *followed_ids]
+
+        tickets = Ticket.objects.filter(user_id__in=users_ids_to_get_posts_from)
+        # a subquery on the user's tickets rather than a join, so each side of the OR is searched in an index
+        reviews = Review.objects.filter(
+            Q(user_id__in=users_ids_to_get_posts_from) | Q(ticket__in=Ticket.objects.filter(user=user).values("id"))
+        )
+
+        return FeedService.merge(tickets, reviews, cursor)
+
+    @staticmethod
+    def timeline_rows(user, cursor: FeedCursor | None = None) -> QuerySet:
+        """Rows of the feed of a user, read from the materialized timeline."""
+        return (
+            TimelineService.feed_rows(user)
+            .filter(FeedService.keyset_filter(cursor, id_field="post_id"))
+            .order_by(*FEED_ORDERING)
+        )
+
+    @staticmethod
+    def user_posts_rows(user, cursor: FeedCursor | None = None) -> QuerySet:
+        """Rows of the tickets and reviews published by a user."""
+        return FeedService.merge(Ticket.objects.filter(user=user), Review.objects.filter(user=user), cursor)
+
+    @staticmethod
+    def _hydration_querysets(rows: list[dict]) -> tuple[QuerySet | None, QuerySet | None]:
+        """Querysets of the Ticket and Review instances matching rows, None when rows have none of a kind."""
+        tickets_ids = [row["post_id"] for row in rows if row["kind"] == TICKET]
+        reviews_ids = [row["post_id"] for row in rows if row["kind"] == REVIEW]
+
+        # select_related() (relation one to one) and the review flag annotation are used to avoid
+        # multiple queries while rendering the posts. No ordering, the posts are put back in rows order.
+        tickets = (
+            Ticket.objects.filter(id__in=tickets_ids).select_related("user").with_review_flag().order_by()
+            if tickets_ids
+            else None
+        )
+        reviews = (
+            Review.objects.filter(id__in=reviews_ids).select_related("ticket__user", "user").order_by()
+            if reviews_ids
+            else None
+        )
+        return tickets, reviews
+
+    @staticmethod
+    def _in_rows_order(rows: list[dict], tickets: Iterable[Ticket], reviews: Iterable[Review]) -> list:
+        instances = {(TICKET, ticket.id): ticket for ticket in tickets}
+        instances.update({(REVIEW, review.id): review for review in reviews})
+
+        # a post may have been deleted between the queries
+        return [instances[(row["kind"], row["post_id"])] for row in rows if (row["kind"], row["post_id"]) in instances]
+
+    @staticmethod
+    def hydrate(rows: list[dict]) -> list:
+        """Load the Ticket and Review instances matching rows, and return them in rows order."""
+        tickets, reviews = FeedService._hydration_querysets(rows)
+        return FeedService._in_rows_order(rows, tickets or [], reviews or [])
+
+    @staticmethod
+    async def ahydrate(rows: list[dict]) -> list:
+        """Async version of hydrate(), the tickets and the reviews being loaded concurrently."""
+
+        async def load(queryset: QuerySet | None) -> list:
+            return [instance async for instance in queryset.aiterator()] if queryset is not None else []
+
+        tickets, reviews = await asyncio.gather(*map(load, FeedService._hydration_querysets(rows)))
+        return FeedService._in_rows_order(rows, tickets, reviews)
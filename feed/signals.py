@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review
+from tickets.models import Ticket
+
+from .follow_graph import FollowGraph
+from .models import FeedEntry, Subscription
+from .timeline import TimelineService
+
+
+@receiver(post_save, sender=Ticket)
+def add_ticket_to_timelines(sender, instance, created, **kwargs):
+    """Fan out a new ticket to the timelines of its author and of its author's followers."""
+    if created:
+        TimelineService.fan_out_ticket(instance)
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_timelines(sender, instance, created, **kwargs):
+    """Fan out a new review to the timelines of its author, of its author's followers and of the ticket's author."""
+    if created:
+        TimelineService.fan_out_review(instance)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_from_timelines(sender, instance, **kwargs):
+    TimelineService.remove_post(FeedEntry.Kind.TICKET, instance.id)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_timelines(sender, instance, **kwargs):
+    TimelineService.remove_post(FeedEntry.Kind.REVIEW, instance.id)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_timeline_on_follow(sender, instance, created, **kwargs):
+    """
+    Add the posts of the followed user to the follower's timeline.
+    Triggered by User.follow() as well as by the subscription form.
+    """
+    if created:
+        TimelineService.backfill(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def trim_timeline_on_unfollow(sender, instance, **kwargs):
+    """
+    Remove the posts of the unfollowed user from the follower's timeline.
+    Triggered by User.unfollow() as well as by the unsubscribe view.
+    """
+    TimelineService.trim(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_follow_graph(sender, instance, **kwargs):
+    """Drop the cached follow graph of both users of a subscription created, changed or deleted."""
+    FollowGraph.invalidate(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_save, sender=Subscription)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        get_user_model().objects.update_follow_counts(instance.follower_id, instance.followed_id, 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_follow_counts(sender, instance, **kwargs):
+    get_user_model().objects.update_follow_counts(instance.follower_id, instance.followed_id, -1)
@@ -0,0 +1,134 @@
+import heapq
+import logging
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from reviews.models import Review
+
+from .follow_graph import FollowGraph
+from .models import FollowSuggestion, Subscription
+
+
+logger = logging.getLogger("feed")
+
+BATCH_SIZE = 2000
+
+# weight of each signal in the score of a suggestion
+MUTUAL_FOLLOW_WEIGHT = 1.0
+SHARED_REVIEW_WEIGHT = 2.0
+
+
+class SuggestionService:
+    """
+    Service class computing and reading the "who to follow" suggestions (FollowSuggestion table).
+
+    An account is suggested to a user when:
+        - users they follow follow it (friends of friends, second degree of the follow graph),
+        - they exchanged reviews: one of them reviewed a ticket of the other.
+    Suggestions are computed for every user at once by a set intersection pass over the whole follow graph,
+    loaded in memory, and only the settings.FOLLOW_SUGGESTIONS_STORED best ones of each user are kept.
+    """
+
+    @staticmethod
+    def _load_graph() -> dict[int, set[int]]:
+        """The ids of the users followed by each user."""
+        following = defaultdict(set)
+        for follower_id, followed_id in Subscription.objects.values_list("follower_id", "followed_id").iterator():
+            following[follower_id].add(followed_id)
+        return following
+
+    @staticmethod
+    def _load_shared_reviews() -> dict[int, Counter]:
+        """The number of reviews exchanged by each user with each other user, in either direction."""
+        shared_reviews = defaultdict(Counter)
+        reviews = Review.objects.values_list("user_id", "ticket__user_id").iterator()
+        for reviewer_id, author_id in reviews:
+            if reviewer_id != author_id:
+                shared_reviews[reviewer_id][author_id] += 1
+                shared_reviews[author_id][reviewer_id] += 1
+        return shared_reviews
+
+    @staticmethod
+    def compute_for_user(
+        user_id: int, following: dict[int, set[int]], shared_reviews: dict[int, Counter], limit: int
+    ) -> list[FollowSuggestion]:
+        """The limit best suggestions for a user, from the follow graph and the shared reviews of every user."""
+        followed_ids = following.get(user_id, set())
+
+        mutual_follows = Counter()
+        for followed_id in followed_ids:
+            mutual_follows.update(following.get(followed_id, ()))
+        user_shared_reviews = shared_reviews.get(user_id, Counter())
+
+        candidates = (mutual_follows.keys() | user_shared_reviews.keys()) - followed_ids - {user_id}
+        scores = {
+            candidate_id: mutual_follows[candidate_id] * MUTUAL_FOLLOW_WEIGHT
+            + user_shared_reviews[candidate_id] * SHARED_REVIEW_WEIGHT
+            for candidate_id in candidates
+        }
+        # ties broken by id, so the suggestions are stable from one computation to the next
+        best = heapq.nsmallest(limit, scores, key=lambda candidate_id: (-scores[candidate_id], candidate_id))
+
+        return [
+            FollowSuggestion(
+                user_id=user_id,
+                suggested_id=candidate_id,
+                score=scores[candidate_id],
+                mutual_follows=mutual_follows[candidate_id],
+                shared_reviews=user_shared_reviews[candidate_id],
+            )
+            for candidate_id in best
+        ]
+
+    @staticmethod
+    def rebuild(limit: int | None = None) -> int:
+        """Replace every suggestion by freshly computed ones, and return the number of suggestions created."""
+        limit = limit or settings.FOLLOW_SUGGESTIONS_STORED
+        following = SuggestionService._load_graph()
+        shared_reviews = SuggestionService._load_shared_reviews()
+        users_ids = following.keys() | shared_reviews.keys()
+
+        created = 0
+        with transaction.atomic():
+            FollowSuggestion.objects.all().delete()
+
+            batch = []
+            for user_id in sorted(users_ids):
+                batch.extend(SuggestionService.compute_for_user(user_id, following, shared_reviews, limit))
+                if len(batch) >= BATCH_SIZE:
+                    FollowSuggestion.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+
+            FollowSuggestion.objects.bulk_create(batch)
+            created += len(batch)
+
+        logger.info(f"{created} follow suggestions computed for {len(users_ids)} users")
+        return created
+
+    @staticmethod
+    def _top_queryset(user_id: int):
+        # more rows than displayed, as the users followed since the computation are skipped
+        limit = settings.FOLLOW_SUGGESTIONS_DISPLAYED * 2
+        return FollowSuggestion.objects.filter(user_id=user_id).select_related("suggested").order_by("-score")[:limit]
+
+    @staticmethod
+    def _not_followed(suggestions: list[FollowSuggestion], followed_ids: frozenset[int]) -> list[FollowSuggestion]:
+        suggestions = [suggestion for suggestion in suggestions if suggestion.suggested_id not in followed_ids]
+        return suggestions[: settings.FOLLOW_SUGGESTIONS_DISPLAYED]
+
+    @staticmethod
+    def top(user_id: int) -> list[FollowSuggestion]:
+        """The best suggestions of a user, skipping the users they followed since the suggestions were computed."""
+        return SuggestionService._not_followed(
+            list(SuggestionService._top_queryset(user_id)), FollowGraph.followed_ids(user_id)
+        )
+
+    @staticmethod
+    async def atop(user_id: int) -> list[FollowSuggestion]:
+        """Async version of top()."""
+        suggestions = [suggestion async for suggestion in SuggestionService._top_queryset(user_id)]
+        return SuggestionService._not_followed(suggestions, frozenset(await FollowGraph.afollowing(user_id)))
@@ -0,0 +1,180 @@
+import logging
+
+from collections.abc import Iterable
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from reviews.models import Review
+from tickets.models import Ticket
+
+from .models import FeedEntry, Subscription
+
+
+logger = logging.getLogger("feed")
+
+BATCH_SIZE = 2000
+
+
+class TimelineService:
+    """
+    Service class maintaining the materialized timelines (FeedEntry table).
+
+    A post is visible in the feed of:
+        - its author,
+        - the followers of its author,
+        - the author of the ticket, for a review in response to a ticket.
+    """
+
+    @staticmethod
+    def feed_rows(user) -> QuerySet:
+        """Rows (kind, post_id, time_created) of the feed of a user, in feed order."""
+        return FeedEntry.objects.filter(owner=user).values("kind", "post_id", "time_created")
+
+    @staticmethod
+    def _create(entries: Iterable[FeedEntry]) -> int:
+        """Insert entries by batches, without loading them all in memory, and return how many were inserted."""
+        created = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == BATCH_SIZE:
+                # ignore_conflicts: a post may already be in a feed, e.g. a review of a followed user on our ticket
+                FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                created += len(batch)
+                batch = []
+
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        return created + len(batch)
+
+    @staticmethod
+    def _fan_out(kind: str, post_id: int, author_id: int, time_created, owners_ids: Iterable[int]):
+        """
+        Add a new post to the feed of owners_ids and of the followers of its author.
+
+        The followers are read from the Subscription table by the INSERT ... SELECT itself, not from the cached
+        follow graph: a cache entry of another process may miss a subscription made meanwhile.
+        """
+        owners = " UNION ".join(["SELECT %s"] * len(owners_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FeedEntry._meta.db_table} (owner_id, author_id, kind, post_id, time_created) "
+                "SELECT owner_id, %s, %s, %s, %s FROM ("
+                f"SELECT follower_id AS owner_id FROM {Subscription._meta.db_table} WHERE followed_id = %s "
+                f"UNION {owners}"
+                # WHERE true: lets SQLite parse the upsert clause after a SELECT
+                ") WHERE true "
+                # a post may reach a feed twice, e.g. a review of a followed user on our ticket
+                "ON CONFLICT DO NOTHING",
+                [
+                    author_id,
+                    kind,
+                    post_id,
+                    connection.ops.adapt_datetimefield_value(time_created),
+                    author_id,
+                    *owners_ids,
+                ],
+            )
+
+    @staticmethod
+    def fan_out_ticket(ticket: Ticket):
+        """Add a new ticket to the feed of its author and of its author's followers."""
+        TimelineService._fan_out(
+            FeedEntry.Kind.TICKET, ticket.id, ticket.user_id, ticket.time_created, [ticket.user_id]
+        )
+
+    @staticmethod
+    def fan_out_review(review: Review):
+        """Add a new review to the feed of its author, of its author's followers and of the ticket's author."""
+        TimelineService._fan_out(
+            FeedEntry.Kind.REVIEW,
+            review.id,
+            review.user_id,
+            review.time_created,
+            list({review.user_id, review.ticket.user_id}),
+        )
+
+    @staticmethod
+    def remove_post(kind: str, post_id: int):
+        """Remove a deleted post from every feed."""
+        FeedEntry.objects.filter(kind=kind, post_id=post_id).delete()
+
+    @staticmethod
+    def backfill(follower_id: int, followed_id: int):
+        """Add every post of a newly followed user to the feed of the follower."""
+        tickets = Ticket.objects.filter(user_id=followed_id).values_list("id", "time_created")
+        reviews = Review.objects.filter(user_id=followed_id).values_list("id", "time_created")
+
+        TimelineService._create(
+            FeedEntry(
+                owner_id=follower_id,
+                author_id=followed_id,
+                kind=kind,
+                post_id=post_id,
+                time_created=time_created,
+            )
+            for kind, posts in ((FeedEntry.Kind.TICKET, tickets), (FeedEntry.Kind.REVIEW, reviews))
+            for post_id, time_created in posts.iterator(chunk_size=BATCH_SIZE)
+        )
+
+    @staticmethod
+    def trim(follower_id: int, followed_id: int):
+        """
+        Remove the posts of an unfollowed user from the feed of the follower,
+        except the reviews in response to the follower's tickets, which stay visible.
+        """
+        reviews_on_follower_tickets = Review.objects.filter(user_id=followed_id, ticket__user_id=follower_id)
+
+        FeedEntry.objects.filter(owner_id=follower_id, author_id=followed_id).exclude(
+            kind=FeedEntry.Kind.REVIEW, post_id__in=reviews_on_follower_tickets.values("id")
+        ).delete()
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Rebuild every timeline from scratch and return the number of entries created.
+        Entries are computed and inserted by the database in a single INSERT ... SELECT,
+        without loading posts or subscriptions in Python.
+        """
+        entries_table = FeedEntry._meta.db_table
+        subscriptions_table = Subscription._meta.db_table
+        tickets_table = Ticket._meta.db_table
+        reviews_table = Review._meta.db_table
+
+        # (owner, post) pairs: the author, their followers, and the ticket's author for a review
+        entries = f"""
+            SELECT ticket.user_id AS owner_id, ticket.user_id AS author_id, %s AS kind, ticket.id AS post_id,
+                ticket.time_created AS time_created
+            FROM {tickets_table} AS ticket
+            UNION ALL
+            SELECT subscription.follower_id, ticket.user_id, %s, ticket.id, ticket.time_created
+            FROM {tickets_table} AS ticket
+            JOIN {subscriptions_table} AS subscription ON subscription.followed_id = ticket.user_id
+            UNION ALL
+            SELECT review.user_id, review.user_id, %s, review.id, review.time_created
+            FROM {reviews_table} AS review
+            UNION ALL
+            SELECT subscription.follower_id, review.user_id, %s, review.id, review.time_created
+            FROM {reviews_table} AS review
+            JOIN {subscriptions_table} AS subscription ON subscription.followed_id = review.user_id
+            UNION ALL
+            SELECT ticket.user_id, review.user_id, %s, review.id, review.time_created
+            FROM {reviews_table} AS review
+            JOIN {tickets_table} AS ticket ON ticket.id = review.ticket_id
+        """
+        kinds = [FeedEntry.Kind.TICKET] * 2 + [FeedEntry.Kind.REVIEW] * 3
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            FeedEntry.objects.all().delete()
+            cursor.execute(
+                f"INSERT INTO {entries_table} (owner_id, author_id, kind, post_id, time_created) "
+                # WHERE true: lets SQLite parse the upsert clause after a SELECT
+                f"SELECT * FROM ({entries}) WHERE true "
+                # a post may reach a feed twice, e.g. a review of a followed user on our ticket
+                "ON CONFLICT DO NOTHING",
+                kinds,
+            )
+            created = FeedEntry.objects.count()
+
+        logger.info(f"Timelines rebuilt with {created} entries.")
+        return created
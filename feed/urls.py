@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -5,9 +6,22 @@ from . import views
 
 app_name = "feed"
 
+if settings.FEED_ASYNC_VIEWS:
+    subscription_landing_view, user_posts_view, feed_posts_view = (
+        views.AsyncSubscriptionLandingView,
+        views.AsyncUserPostsView,
+        views.AsyncFeedPostsView,
+    )
+else:
+    subscription_landing_view, user_posts_view, feed_posts_view = (
+        views.SubscriptionLandingView,
+        views.UserPostsView,
+        views.FeedPostsView,
+    )
+
 urlpatterns = [
-    path("subscription/", views.SubscriptionLandingView.as_view(), name="subscriptions"),
+    path("subscription/", subscription_landing_view.as_view(), name="subscriptions"),
     path("subscriptions/<int:pk>/delete/", views.SubscriptionDeleteView.as_view(), name="subscription_delete"),
-    path("user_posts/", views.UserPostsView.as_view(), name="user_posts"),
-    path("", views.FeedPostsView.as_view(), name="feed_posts"),
+    path("user_posts/", user_posts_view.as_view(), name="user_posts"),
+    path("", feed_posts_view.as_view(), name="feed_posts"),
 ]
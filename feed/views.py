@@ -1,21 +1,41 @@
+import asyncio
 import logging
 
+from typing import TYPE_CHECKING
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.shortcuts import render
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, ListView
+from django.views.generic import CreateView, DeleteView, ListView, View
 
-from reviews.models import Review
-from tickets.models import Ticket
+from litrevu.mixins import (
+    AsyncLoginRequiredMixin,
+    AsyncReplicaReadMixin,
+    ReplicaReadMixin,
+    StreamingTemplateResponseMixin,
+)
 
+from .follow_graph import FollowGraph
 from .form import CreateSubscriptionForm
 from .models import Subscription
+from .services import FeedCursor, FeedPage, FeedService
+from .suggestions import SuggestionService
+
+
+if TYPE_CHECKING:
+    from django.db.models import QuerySet
+    from django.http import HttpRequest
 
 
 logger = logging.getLogger("feed")
+User = get_user_model()
 
 
-class SubscriptionLandingView(LoginRequiredMixin, CreateView):
+class SubscriptionLandingView(LoginRequiredMixin, ReplicaReadMixin, CreateView):
     template_name = "feed/subscription_landing.html"
     model = Subscription
     form_class = CreateSubscriptionForm
@@ -30,10 +50,22 @@ class SubscriptionLandingView(LoginRequiredMixin, CreateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
 
+        # the follow graph is cached, only the users to display are loaded
+        following = FollowGraph.following(user.id)
+        followers_ids = FollowGraph.followers_ids(user.id)
+        users = User.objects.in_bulk([*following, *followers_ids])
+
         context.update(
             {
-                "following": user.following.select_related("followed"),
-                "followers": user.followers.select_related("follower"),
+                # (subscription id, followed user) pairs, the subscription id being used to unfollow
+                "following": [
+                    (subscription_id, users[followed_id])
+                    for followed_id, subscription_id in following.items()
+                    if followed_id in users
+                ],
+                "followers": [users[follower_id] for follower_id in followers_ids if follower_id in users],
+                # precomputed, read with one query on the suggestions index
+                "suggestions": SuggestionService.top(user.id),
             }
         )
         return context
@@ -68,72 +100,113 @@ class SubscriptionDeleteView(LoginRequiredMixin, DeleteView):
         return response
 
 
-class UserPostsView(LoginRequiredMixin, ListView):
-    template_name = "feed/user_posts.html"
-    context_object_name = "posts"
-    # pagination won't work because of merging 2 queryset with not same attributes
-    # normalize them (create a dict) would be too complex as we would loose relationship between objects
+class FeedPageMixin:
+    """
+    Mixin for views listing a feed page by page.
 
-    def get_queryset(self):
-        current_user = self.request.user
+    The position in the feed is given by the "cursor" GET parameter, which is the encoded position
+    of the last post of the previous page (keyset pagination).
+    """
 
-        user_reviews = Review.objects.filter(user=current_user).select_related("ticket", "user")
-        user_tickets = Ticket.objects.filter(user=current_user).select_related("user").prefetch_related("review")
+    request: "HttpRequest"
+    page_size: int = settings.FEED_PAGE_SIZE
+    chunk_size: int = settings.FEED_CHUNK_SIZE
+    streaming: bool = settings.FEED_STREAMING_RENDER
 
-        posts = sorted([*user_reviews, *user_tickets], key=lambda x: x.time_created, reverse=True)
+    def get_rows(self, cursor: FeedCursor | None) -> "QuerySet":
+        raise NotImplementedError("FeedPageMixin requires a definition of get_rows()")
 
-        return posts
+    def get_queryset(self) -> FeedPage:
+        cursor = FeedCursor.decode(self.request.GET.get("cursor"))
+        return FeedPage(self.get_rows(cursor), self.page_size, self.chunk_size)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["user"] = self.request.user
+        context["is_first_page"] = "cursor" not in self.request.GET
         return context
 
 
-class FeedPostsView(LoginRequiredMixin, ListView):
+class UserPostsView(LoginRequiredMixin, ReplicaReadMixin, FeedPageMixin, StreamingTemplateResponseMixin, ListView):
+    template_name = "feed/user_posts.html"
+    context_object_name = "posts"
+
+    def get_rows(self, cursor):
+        return FeedService.user_posts_rows(self.request.user, cursor)
+
+
+class FeedPostsView(LoginRequiredMixin, ReplicaReadMixin, FeedPageMixin, StreamingTemplateResponseMixin, ListView):
     template_name = "feed/feed_posts.html"
     context_object_name = "posts"
-    # pagination won't work because of merging 2 queryset with not same attributes
-    # normalize them (create a dict) would be too complex as we would loose relationship between objects
 
-    def get_queryset(self):
-        current_user = self.request.user
+    def get_rows(self, cursor):
+        if settings.FEED_MATERIALIZED_TIMELINE:
+            return FeedService.timeline_rows(self.request.user, cursor)
+        return FeedService.feed_rows(self.request.user, cursor)
 
-        users_ids_followed_by_current_user = Subscription.objects.filter(follower=current_user).values_list(
-            "followed_id",
-            flat=True,  # avoid a list of tuples, result will be a list of ids
-        )
 
-        users_ids_to_get_posts_from = [current_user.id, *users_ids_followed_by_current_user]
+# Async versions of the views above, used by ASGI deployments (settings.FEED_ASYNC_VIEWS): they read the database
+# with the async ORM, and only render their template in a thread.
 
-        # select_related() (relation one to one) and prefetch_related() (relation many to many) are used to avoid
-        # multiple queries
-        followed_users_reviews = Review.objects.filter(user_id__in=users_ids_to_get_posts_from).select_related(
-            "ticket", "user"
-        )
 
-        followed_users_tickets = (
-            Ticket.objects.filter(user_id__in=users_ids_to_get_posts_from)
-            .select_related("user")
-            .prefetch_related("review")
-        )
+class AsyncSubscriptionLandingView(AsyncLoginRequiredMixin, AsyncReplicaReadMixin, View):
+    """Async version of SubscriptionLandingView: the form submission is handled by the sync view."""
 
-        # Reviews in response to current user's tickets (even if reviewer is not followed)
-        reviews_on_current_user_tickets = (
-            Review.objects.filter(ticket__user=current_user)
-            .exclude(user_id__in=users_ids_to_get_posts_from)  # Exclude already fetched reviews
-            .select_related("ticket", "user")
-        )
+    template_name = "feed/subscription_landing.html"
 
-        posts = sorted(
-            [*reviews_on_current_user_tickets, *followed_users_reviews, *followed_users_tickets],
-            key=lambda x: x.time_created,
-            reverse=True,
+    async def get(self, request, *args, **kwargs):
+        following, followers_ids, suggestions = await asyncio.gather(
+            FollowGraph.afollowing(request.user.id),
+            FollowGraph.afollowers_ids(request.user.id),
+            SuggestionService.atop(request.user.id),
         )
+        users = await User.objects.ain_bulk([*following, *followers_ids])
 
-        return posts
+        context = {
+            "form": CreateSubscriptionForm(user=request.user),
+            "following": [
+                (subscription_id, users[followed_id])
+                for followed_id, subscription_id in following.items()
+                if followed_id in users
+            ],
+            "followers": [users[follower_id] for follower_id in followers_ids if follower_id in users],
+            "suggestions": suggestions,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["user"] = self.request.user
-        return context
+    async def post(self, request, *args, **kwargs):
+        # a write, run through the sync view and its write transaction
+        return await sync_to_async(SubscriptionLandingView.as_view())(request, *args, **kwargs)
+
+
+class AsyncFeedPageMixin:
+    """Async version of FeedPageMixin: the page is fetched and hydrated with the async ORM, then rendered."""
+
+    template_name: str
+    page_size: int = settings.FEED_PAGE_SIZE
+
+    async def get_rows(self, cursor: FeedCursor | None) -> "QuerySet":
+        raise NotImplementedError("AsyncFeedPageMixin requires a definition of get_rows()")
+
+    async def get(self, request, *args, **kwargs):
+        cursor = FeedCursor.decode(request.GET.get("cursor"))
+        posts = await FeedPage(await self.get_rows(cursor), self.page_size).aload()
+
+        context = {"posts": posts, "user": request.user, "is_first_page": "cursor" not in request.GET}
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+class AsyncUserPostsView(AsyncLoginRequiredMixin, AsyncReplicaReadMixin, AsyncFeedPageMixin, View):
+    template_name = "feed/user_posts.html"
+
+    async def get_rows(self, cursor):
+        return FeedService.user_posts_rows(self.request.user, cursor)
+
+
+class AsyncFeedPostsView(AsyncLoginRequiredMixin, AsyncReplicaReadMixin, AsyncFeedPageMixin, View):
+    template_name = "feed/feed_posts.html"
+
+    async def get_rows(self, cursor):
+        if settings.FEED_MATERIALIZED_TIMELINE:
+            return FeedService.timeline_rows(self.request.user, cursor)
+        return await FeedService.afeed_rows(self.request.user, cursor)
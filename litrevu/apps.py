@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class LitrevuConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "litrevu"
+    verbose_name = "LitRevu project"
+
+    def ready(self):
+        from .database import configure_sqlite
+        from .profiling import install_query_timer
+
+        # tune SQLite according to the database profile
+        connection_created.connect(configure_sqlite)
+        # time the SQL queries of every database connection, for the profiling middleware
+        connection_created.connect(install_query_timer)
@@ -0,0 +1,98 @@
+import functools
+import logging
+import random
+import time
+
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+
+logger = logging.getLogger("database")
+
+
+def apply_pragmas(cursor, pragmas: dict):
+    """Run PRAGMA statements on a cursor, Django's or sqlite3's."""
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS to every new SQLite connection."""
+    if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+        return
+
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def is_lock_error(error: OperationalError) -> bool:
+    return "database is locked" in str(error) or "database table is locked" in str(error)
+
+
+def write_transaction(function=None, *, using: str = DEFAULT_DB_ALIAS):
+    """
+    Decorator running function in a write transaction, retried when the database is locked.
+
+    On SQLite, transaction.atomic() starts a deferred transaction, which takes the write lock on its first write:
+    a concurrent writer then fails right away with "database is locked", whatever the busy timeout, since
+    waiting could deadlock. The transaction is started with BEGIN IMMEDIATE instead, so the write lock is taken
+    (or waited for, up to the busy timeout) before any statement runs. Only BEGIN IMMEDIATE is retried,
+    settings.WRITE_TRANSACTION_RETRIES times with an exponential backoff, when the lock could not be taken:
+    function runs once, holding the lock, so the objects it mutates (e.g. a form instance) are never replayed.
+
+    Nested in an outer transaction, function runs in a savepoint without retry: the outer transaction
+    holds the lock or has to be retried itself.
+
+    Usage:
+        @write_transaction
+        def publish(...):
+            ...
+    """
+    if function is None:
+        return functools.partial(write_transaction, using=using)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        connection = connections[using]
+        if connection.in_atomic_block:
+            with transaction.atomic(using=using):
+                return function(*args, **kwargs)
+
+        with ExitStack() as stack:
+            for attempt in range(settings.WRITE_TRANSACTION_RETRIES + 1):
+                try:
+                    with immediate_transactions(connection):
+                        # runs BEGIN IMMEDIATE, the transaction is left open until function returns
+                        stack.enter_context(transaction.atomic(using=using))
+                    break
+                except OperationalError as error:
+                    if not is_lock_error(error) or attempt == settings.WRITE_TRANSACTION_RETRIES:
+                        raise
+                    # full jitter, so the writers waiting for the same lock do not retry all at once
+                    delay = random.uniform(0, min(settings.WRITE_TRANSACTION_BACKOFF * 2**attempt, 1.0))
+                    logger.warning(
+                        f"{function.__qualname__}: database locked, retry {attempt + 1} in {delay * 1000:.0f}ms"
+                    )
+                    time.sleep(delay)
+
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def immediate_transactions(connection):
+    """Start the transactions of a SQLite connection with BEGIN IMMEDIATE, other databases are left as is."""
+    if connection.vendor != "sqlite":
+        yield
+        return
+
+    # the transaction mode is read from the settings when connecting, the connection is opened first
+    connection.ensure_connection()
+    transaction_mode, connection.transaction_mode = connection.transaction_mode, "IMMEDIATE"
+    try:
+        yield
+    finally:
+        connection.transaction_mode = transaction_mode
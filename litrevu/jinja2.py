@@ -1,14 +1,116 @@
+from collections.abc import Iterator
+
+from django.conf import settings
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.middleware.csrf import get_token
+from django.template.backends.jinja2 import Jinja2 as Jinja2Backend
+from django.template.backends.jinja2 import Template
+from django.template.backends.utils import csrf_input_lazy, csrf_token_lazy
 from django.urls import reverse
-from jinja2 import Environment
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup, escape
+
+from litrevu.profiling import timed, timed_iterator
+from litrevu.staticfiles import bundle_path
+
+
+# minimum size of the chunks sent by stream_template, to avoid flushing every few characters
+STREAM_BUFFER_SIZE = 4096
+
+
+class ProfiledTemplate(Template):
+    """Template whose rendering time is added to the metrics of the current request (see litrevu.profiling)."""
+
+    def render(self, context=None, request=None):
+        with timed("template_time"):
+            return super().render(context, request)
+
+
+class Jinja2(Jinja2Backend):
+    """Jinja2 template backend measuring the rendering of templates."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.env.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Cache the output of a block of template in the Django cache:
+
+        {% cache "fragment_name", post.id, post.cache_version %}
+            ...
+        {% endcache %}
+
+    The block is rendered once per fragment name and values of the key, then read from the cache
+    for settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT seconds. The key must vary on everything the block
+    displays, so the block must not depend on the viewer (user, csrf token...).
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        fragment_name = parser.parse_expression()
+        vary_on = []
+        while parser.stream.skip_if("comma"):
+            vary_on.append(parser.parse_expression())
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render_cached", [fragment_name, nodes.List(vary_on)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render_cached(self, fragment_name: str, vary_on: list, caller) -> Markup:
+        key = make_template_fragment_key(fragment_name, vary_on)
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = str(caller())
+            cache.set(key, fragment, settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT)
+        # the block has already been escaped when it was rendered
+        return Markup(fragment)
+
+
+def bytecode_cache() -> FileSystemBytecodeCache:
+    """Cache of the compiled templates of the production profile, shared by every worker."""
+    settings.JINJA2_BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(settings.JINJA2_BYTECODE_CACHE_DIR))
+
+
+def bundle_links(name: str) -> Markup:
+    """
+    <link> tags of a CSS bundle of settings.STATIC_BUNDLES: the bundle built by collectstatic
+    with the production static profile, each file of the bundle otherwise.
+    """
+    paths = [bundle_path(name)] if settings.STATIC_PROFILE == "production" else settings.STATIC_BUNDLES[name]
+    return Markup("\n".join(f'<link rel="stylesheet" href="{escape(staticfiles_storage.url(p))}">' for p in paths))
 
 
 def environment(**options):
+    """
+    Build the Jinja2 environment of the project.
+
+    With the production profile (settings.JINJA2_PROFILE), templates are not checked for changes
+    and their compiled code is stored in settings.JINJA2_BYTECODE_CACHE_DIR, shared by every worker.
+    """
+    if settings.JINJA2_PROFILE == "production":
+        options["auto_reload"] = False
+        options["bytecode_cache"] = bytecode_cache()
+    else:
+        options["auto_reload"] = True
+
     env = Environment(**options)
+    env.add_extension(FragmentCacheExtension)
     env.globals.update(
         {
             "static": staticfiles_storage.url,
+            "bundle_links": bundle_links,
             "url": reverse,
         }
     )
@@ -22,3 +124,38 @@ def user_context(request):
         "request": request,
         "csrf_input": f'<input type="hidden" name="csrfmiddlewaretoken" value="{get_token(request)}">',
     }
+
+
+def stream_template(template: Template, context: dict, request) -> Iterator[str]:
+    """
+    Render a Jinja2 template chunk by chunk with Template.generate(), to be sent in a StreamingHttpResponse.
+
+    The context is built eagerly, as Template.render() does, so context processors (csrf token, user...)
+    run before the response headers are sent. Then the output is yielded as soon as STREAM_BUFFER_SIZE
+    characters have been produced: lazy values of the context (e.g. feed posts) are only evaluated
+    when the template reaches them.
+    """
+    context = {
+        **context,
+        "request": request,
+        "csrf_input": csrf_input_lazy(request),
+        "csrf_token": csrf_token_lazy(request),
+    }
+    for context_processor in template.backend.template_context_processors:
+        context.update(context_processor(request))
+
+    return _buffered(timed_iterator(template.template.generate(context), "template_time"))
+
+
+def _buffered(chunks: Iterator[str]) -> Iterator[str]:
+    buffer = []
+    buffered_size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size >= STREAM_BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            buffered_size = 0
+
+    yield "".join(buffer)
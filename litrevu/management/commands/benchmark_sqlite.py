@@ -0,0 +1,144 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from litrevu.database import apply_pragmas
+
+
+# sqlite3 and Django default timeout (seconds) of the development profile
+DEFAULT_TIMEOUT = 5.0
+
+PROFILES = {
+    # no pragma, a new connection for each request (CONN_MAX_AGE = 0)
+    "development": ({}, False),
+    # production pragmas, connections kept open (CONN_MAX_AGE > 0)
+    "production": (settings.SQLITE_PRODUCTION_PRAGMAS, True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the concurrent read and write throughput of SQLite with the development and production "
+        "database profiles, on a temporary database shaped like the feed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8, help="Number of threads reading feed pages")
+        parser.add_argument("--writers", type=int, default=2, help="Number of threads publishing posts")
+        parser.add_argument("--duration", type=float, default=5, help="Duration of each run, in seconds")
+        parser.add_argument("--rows", type=int, default=100_000, help="Number of posts created before each run")
+        parser.add_argument("--users", type=int, default=1000, help="Number of authors of the posts")
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile, (pragmas, persistent) in PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / "benchmark.sqlite3"
+                self.create_database(path, pragmas, options["rows"], options["users"])
+                results[profile] = self.run(path, pragmas, persistent, options)
+
+            result = results[profile]
+            self.stdout.write(
+                f"{profile:<12} reads={result['reads_per_second']:>9.0f}/s "
+                f"writes={result['writes_per_second']:>7.0f}/s "
+                f"read p95={result['read_p95_ms']:>6.1f}ms write p95={result['write_p95_ms']:>7.1f}ms "
+                f"locked errors={result['errors']}"
+            )
+
+        for metric in ("reads_per_second", "writes_per_second"):
+            ratio = results["production"][metric] / max(results["development"][metric], 1)
+            self.stdout.write(self.style.SUCCESS(f"{metric}: production is x{ratio:.2f} development"))
+
+    def connect(self, path: Path, pragmas: dict) -> sqlite3.Connection:
+        connection = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT, check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def create_database(self, path: Path, pragmas: dict, rows: int, users: int):
+        rng = random.Random(42)
+        connection = self.connect(path, pragmas)
+        with connection:
+            connection.execute(
+                "CREATE TABLE post (id INTEGER PRIMARY KEY, owner_id INTEGER, title TEXT, time_created REAL)"
+            )
+            connection.execute("CREATE INDEX post_timeline_idx ON post (owner_id, time_created DESC)")
+            connection.executemany(
+                "INSERT INTO post (owner_id, title, time_created) VALUES (?, ?, ?)",
+                ((rng.randrange(users), "title " * 10, rng.random() * 1e9) for _ in range(rows)),
+            )
+        connection.close()
+
+    def run(self, path: Path, pragmas: dict, persistent: bool, options: dict) -> dict:
+        stop = threading.Event()
+        lock = threading.Lock()
+        reads_latencies, writes_latencies = [], []
+        errors = [0]
+
+        def worker(operation, latencies, seed):
+            rng = random.Random(seed)
+            connection = self.connect(path, pragmas) if persistent else None
+            own_latencies = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                current = connection or self.connect(path, pragmas)
+                try:
+                    operation(current, rng)
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                finally:
+                    if not persistent:
+                        current.close()
+                own_latencies.append(time.perf_counter() - start)
+
+            if connection:
+                connection.close()
+            with lock:
+                latencies.extend(own_latencies)
+
+        def read(connection, rng):
+            # a feed page
+            connection.execute(
+                "SELECT id, title, time_created FROM post WHERE owner_id = ? ORDER BY time_created DESC LIMIT 20",
+                (rng.randrange(options["users"]),),
+            ).fetchall()
+
+        def write(connection, rng):
+            # a new post, in its own transaction
+            with connection:
+                connection.execute(
+                    "INSERT INTO post (owner_id, title, time_created) VALUES (?, ?, ?)",
+                    (rng.randrange(options["users"]), "title " * 10, time.time()),
+                )
+
+        threads = [
+            threading.Thread(target=worker, args=(read, reads_latencies, seed)) for seed in range(options["readers"])
+        ] + [
+            threading.Thread(target=worker, args=(write, writes_latencies, -seed - 1))
+            for seed in range(options["writers"])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options["duration"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        def p95(latencies):
+            return sorted(latencies)[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+
+        return {
+            "reads_per_second": len(reads_latencies) / options["duration"],
+            "writes_per_second": len(writes_latencies) / options["duration"],
+            "read_p95_ms": p95(reads_latencies),
+            "write_p95_ms": p95(writes_latencies),
+            "errors": errors[0],
+        }
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.template import engines
+
+from litrevu.jinja2 import bytecode_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every Jinja2 template into the bytecode cache of the production profile, "
+        "so workers do not compile templates on their first requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Empty the bytecode cache before compiling")
+
+    def handle(self, *args, **options):
+        env = engines["jinja2"].env
+        # the development profile does not use the cache, but it can fill it for the production one
+        env.bytecode_cache = env.bytecode_cache or bytecode_cache()
+
+        if options["clear"]:
+            env.bytecode_cache.clear()
+
+        # every template of the DIRS and of the apps jinja2 directories, macros included
+        templates_names = env.list_templates(extensions=["html"])
+        for template_name in templates_names:
+            # loading a template compiles it and stores its bytecode in the cache
+            env.get_template(template_name)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(templates_names)} templates compiled"))
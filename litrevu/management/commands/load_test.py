@@ -0,0 +1,162 @@
+import http.client
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# pages requested by each client, in turn
+URLS = ["/feed/", "/feed/user_posts/", "/feed/subscription/"]
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="(?P<token>[^"]+)"')
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput and latencies of runserver and of the pre-forking server (serve command) on the "
+        "feed pages: each server is started on the current database and loaded by concurrent logged in clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=10, help="Number of concurrent clients")
+        parser.add_argument("--duration", type=float, default=10, help="Duration of each run, in seconds")
+        parser.add_argument("--workers", type=int, default=4, help="Number of workers of the pre-forking server")
+        parser.add_argument("--username", default="Bob", help="User the clients log in as (see create_test_users)")
+        parser.add_argument("--password", default="litrevuTest", help="Password of the user")
+
+    def handle(self, *args, **options):
+        servers = {
+            "runserver": lambda port: ["runserver", "--noreload", f"127.0.0.1:{port}"],
+            "serve": lambda port: ["serve", "--workers", str(options["workers"]), "--bind", f"127.0.0.1:{port}"],
+        }
+
+        for name, arguments in servers.items():
+            port = free_port()
+            # both servers use the cache shared by the workers of the pre-forking server
+            process = subprocess.Popen(
+                [sys.executable, "manage.py", *arguments(port)],
+                env={**os.environ, "CACHE_BACKEND": "file"},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                self.wait_for(port, process)
+                session_cookie = self.login(port, options["username"], options["password"])
+                result = self.load(port, session_cookie, options["clients"], options["duration"])
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait()
+
+            self.stdout.write(
+                f"{name:<10} clients={options['clients']:<4} rps={result['rps']:>7.1f} "
+                f"p50={result['p50_ms']:>8.1f}ms p99={result['p99_ms']:>8.1f}ms errors={result['errors']}"
+            )
+
+    @staticmethod
+    def wait_for(port: int, process: subprocess.Popen, timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"The server exited with code {process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not listen on port {port} within {timeout}s")
+
+    @staticmethod
+    def login(port: int, username: str, password: str) -> str:
+        """Log in through the login page, and return the Cookie header of the session."""
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        connection.request("GET", "/auth/login/")
+        response = connection.getresponse()
+        csrf_token = CSRF_INPUT.search(response.read().decode())
+        cookies = SimpleCookie(response.getheader("Set-Cookie", ""))
+        connection.close()
+        if csrf_token is None or "csrftoken" not in cookies:
+            raise CommandError("No CSRF token in the login page")
+
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        connection.request(
+            "POST",
+            "/auth/login/",
+            body=urlencode({"username": username, "password": password, "csrfmiddlewaretoken": csrf_token["token"]}),
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Cookie": f"csrftoken={cookies['csrftoken'].value}",
+            },
+        )
+        response = connection.getresponse()
+        response.read()
+        cookies.load(response.getheader("Set-Cookie", ""))
+        connection.close()
+        if response.status != 302 or "sessionid" not in cookies:
+            raise CommandError(f"Login of {username} failed, create the user with create_test_users")
+
+        return f"sessionid={cookies['sessionid'].value}"
+
+    @staticmethod
+    def load(port: int, session_cookie: str, clients: int, duration: float) -> dict:
+        """Request the pages from concurrent clients, each one sending a request once its previous one is read."""
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def client_loop(deadline: float):
+            nonlocal errors
+            requests_count = 0
+            while time.perf_counter() < deadline:
+                url = URLS[requests_count % len(URLS)]
+                requests_count += 1
+                start = time.perf_counter()
+                try:
+                    # a new connection per request: the pre-forking server closes the connection after each response
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                    connection.request("GET", url, headers={"Cookie": session_cookie})
+                    response = connection.getresponse()
+                    response.read()
+                    connection.close()
+                    succeeded = response.status == 200
+                except OSError:
+                    succeeded = False
+                with lock:
+                    if succeeded:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+
+        # warm up: imports, compiled templates, cached follow graph
+        client_loop(time.perf_counter())
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client_loop, args=(start + duration,)) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            "rps": len(latencies) / elapsed,
+            "p50_ms": quantiles[49] * 1000,
+            "p99_ms": quantiles[98] * 1000,
+            "errors": errors,
+        }
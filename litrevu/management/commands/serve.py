@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.template import engines
+from django.urls import reverse
+
+from litrevu.server import PreforkServer
+from litrevu.staticfiles import CollectedStaticFilesHandler
+
+
+# cache backends whose entries are only seen by the process that wrote them
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def address(value: str) -> tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid address {value!r}, expected host:port")
+    return host or "0.0.0.0", int(port)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the site with pre-forked worker processes sharing the application loaded once by the master "
+        "(production replacement of runserver). Send SIGHUP to the master to reload the code gracefully"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bind", type=address, default="0.0.0.0:8000", help="Address to listen on, host:port")
+        parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS, help="Number of worker processes")
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=settings.SERVE_MAX_REQUESTS,
+            help="Number of requests after which a worker is replaced (0: never)",
+        )
+        parser.add_argument(
+            "--max-requests-jitter",
+            type=int,
+            default=settings.SERVE_MAX_REQUESTS_JITTER,
+            help="Maximum random number of requests added to --max-requests, for each worker",
+        )
+        parser.add_argument(
+            "--graceful-timeout",
+            type=float,
+            default=settings.SERVE_GRACEFUL_TIMEOUT,
+            help="Seconds given to the workers to finish their current request on stop or reload",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=settings.SERVE_TIMEOUT,
+            help="Seconds after which a connection on which the client sends nothing is closed",
+        )
+        parser.add_argument(
+            "--no-static", action="store_true", help="Do not serve the static files (served by a reverse proxy)"
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+        local_caches = [
+            alias for alias, cache in settings.CACHES.items() if cache["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS
+        ]
+        if options["workers"] > 1 and local_caches:
+            # an invalidation (e.g. of the follow graph) would only reach the worker making it
+            raise CommandError(
+                f"Cache {', '.join(local_caches)} is local to each process, run a single worker (--workers 1) "
+                "or a shared cache backend (CACHE_BACKEND=file)"
+            )
+
+        # load everything before forking, so the workers share it instead of loading it each
+        application = get_wsgi_application()
+        reverse("home")
+        env = engines["jinja2"].env
+        for template_name in env.list_templates(extensions=["html"]):
+            env.get_template(template_name)
+        if not options["no_static"]:
+            # the container has no reverse proxy, static files are served by Django as with runserver,
+            # or from STATIC_ROOT with the production static profile, whose hashed names are unknown to the finders
+            if settings.STATIC_PROFILE == "production":
+                application = CollectedStaticFilesHandler(application)
+            else:
+                application = StaticFilesHandler(application)
+
+        PreforkServer(
+            application,
+            bind=options["bind"],
+            workers=options["workers"],
+            max_requests=options["max_requests"],
+            max_requests_jitter=options["max_requests_jitter"],
+            graceful_timeout=options["graceful_timeout"],
+            timeout=options["timeout"],
+        ).run()
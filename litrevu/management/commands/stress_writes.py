@@ -0,0 +1,171 @@
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from litrevu.database import is_lock_error, write_transaction
+from tickets.form import CustomTicketForm
+from tickets.models import Ticket
+from tickets.services import TicketReviewService
+from users.models import User
+
+
+# how the write paths run their transactions
+MODES = {
+    # transaction.atomic(): deferred transactions, not retried
+    "atomic": lambda function: transaction.atomic()(function),
+    # litrevu.database.write_transaction: immediate transactions, started again when the database is locked
+    "write_transaction": write_transaction,
+}
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress the write paths (ticket with review creation, follow) with concurrent writer threads, "
+        "in a temporary database, with deferred and with immediate retried transactions. "
+        "Then check that concurrent reviews of a ticket end with one review and conflicts, not errors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers", type=int_list, default=[1, 4, 16, 32], help="Numbers of writer threads, comma separated"
+        )
+        parser.add_argument("--duration", type=float, default=5, help="Duration of each run, in seconds")
+        parser.add_argument("--users", type=int, default=200, help="Number of users who can be followed")
+        parser.add_argument("--race-reviewers", type=int, default=8, help="Number of users reviewing the same ticket")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            # a database file, the default in-memory test database locks tables instead of the database
+            connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "stress_writes.sqlite3")
+            old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                users = User.objects.bulk_create(User(username=f"user_{number}") for number in range(options["users"]))
+                for writers in options["writers"]:
+                    for mode in MODES:
+                        result = self.run(mode, writers, users, options["duration"])
+                        self.stdout.write(
+                            f"{mode:<18} writers={writers:<4} ops={result['ops_per_second']:>7.1f}/s "
+                            f"p95={result['p95_ms']:>8.1f}ms locked errors={result['lock_errors']:<5} "
+                            f"other errors={result['other_errors']}"
+                        )
+                self.review_race(options["race_reviewers"])
+            finally:
+                connection.creation.destroy_test_db(old_database_name, verbosity=0)
+                teardown_test_environment()
+
+    def run(self, mode: str, writers: int, users: list[User], duration: float) -> dict:
+        in_transaction = MODES[mode]
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies, errors = [], {"lock_errors": 0, "other_errors": 0}
+
+        # the undecorated function, its transaction is chosen by the mode
+        save_ticket_with_review = in_transaction(TicketReviewService._save_ticket_with_review.__wrapped__)
+        review_formset_class = TicketReviewService.review_formset(nb_of_empty_form=1)
+        prefix = review_formset_class.get_default_prefix()
+
+        def publish(writer: User, rng: random.Random):
+            ticket_form = CustomTicketForm({"title": "Stress ticket", "content": "content " * 20})
+            ticket_form.is_valid()
+            review_formset = review_formset_class(
+                {
+                    f"{prefix}-TOTAL_FORMS": "1",
+                    f"{prefix}-INITIAL_FORMS": "0",
+                    f"{prefix}-0-title": "Stress review",
+                    f"{prefix}-0-rating": str(rng.randint(1, 5)),
+                    f"{prefix}-0-content": "review " * 20,
+                },
+                instance=None,
+            )
+            save_ticket_with_review(ticket_form, review_formset, writer, [])
+
+        def follow(writer: User, rng: random.Random):
+            # get_or_create reads before writing: a deferred transaction has to upgrade its lock
+            followed = rng.choice(users)
+            if followed.id != writer.id:
+                in_transaction(writer.follow)(followed)
+
+        def worker(number: int):
+            rng = random.Random(number)
+            writer = User.objects.create(username=f"writer_{mode}_{writers}_{number}")
+            own_latencies = []
+            while not stop.is_set():
+                operation = publish if rng.random() < 0.5 else follow
+                start = time.perf_counter()
+                try:
+                    operation(writer, rng)
+                except OperationalError as error:
+                    with lock:
+                        errors["lock_errors" if is_lock_error(error) else "other_errors"] += 1
+                    continue
+                except Exception:
+                    with lock:
+                        errors["other_errors"] += 1
+                    continue
+                own_latencies.append(time.perf_counter() - start)
+
+            with lock:
+                latencies.extend(own_latencies)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return {
+            "ops_per_second": len(latencies) / duration,
+            "p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0.0,
+            **errors,
+        }
+
+    def review_race(self, reviewers: int):
+        """Post reviews of the same ticket from concurrent clients: one must be saved, the others get a 409."""
+        author = User.objects.create(username="race_author")
+        ticket = Ticket.objects.create(user=author, title="Raced ticket")
+        url = reverse("reviews:create", kwargs={"ticket_id": ticket.id})
+        barrier = threading.Barrier(reviewers)
+        statuses = []
+
+        def review(number: int):
+            client = Client()
+            client.force_login(User.objects.create(username=f"race_reviewer_{number}"))
+            barrier.wait()
+            try:
+                response = client.post(url, {"title": "Raced review", "rating": "3", "content": ""})
+                statuses.append(response.status_code)
+            except Exception as error:
+                statuses.append(type(error).__name__)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=review, args=(number,)) for number in range(reviewers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counts = {status: statuses.count(status) for status in set(statuses)}
+        message = f"review race between {reviewers} users: {counts}"
+        if counts.get(302) == 1 and counts.get(409) == reviewers - 1:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.ERROR(message))
@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from litrevu.routers import REPLICA_DB_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database to the replica with the SQLite backup API, once or periodically, "
+        "to run the read replica routing locally (see litrevu.routers)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0, help="Copy again every interval seconds, until interrupted"
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=1024,
+            help="Pages copied per step: the primary is only locked during a step, -1 copies it in one step",
+        )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("No replica database configured, set DATABASE_REPLICA_NAME")
+
+        primary, replica = settings.DATABASES[DEFAULT_DB_ALIAS], settings.DATABASES[REPLICA_DB_ALIAS]
+        if "sqlite" not in primary["ENGINE"] or "sqlite" not in replica["ENGINE"]:
+            raise CommandError("sync_replica only copies SQLite databases, use the replication of the database")
+
+        while True:
+            start = time.perf_counter()
+            self.copy(primary["NAME"], replica["NAME"], options["pages"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Replica {replica['NAME']} synced in {(time.perf_counter() - start) * 1000:.0f}ms")
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def copy(self, primary_name, replica_name, pages: int):
+        source = sqlite3.connect(primary_name)
+        target = sqlite3.connect(replica_name, timeout=30)
+        try:
+            # the backup restarts if the primary is written by another connection between two steps
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,191 @@
+"""
+Serving of the uploaded files (MEDIA_ROOT) by the application, when no front server serves them.
+
+MediaMiddleware answers the requests under MEDIA_URL with serve_media(), before the other middlewares
+(sessions, authentication...) run, as media files are public:
+    - strong ETag and Last-Modified headers, answering conditional requests (If-None-Match...) with 304,
+    - single byte ranges (Range, If-Range), for resumed downloads and media players,
+    - immutable caching of the content-addressed blobs (see tickets.storage), whose content never changes,
+    - delivery by the front server when settings.MEDIA_SENDFILE_HEADER is set (X-Sendfile or X-Accel-Redirect),
+      or by a FileResponse, sent with the zero-copy wsgi.file_wrapper of the WSGI server when it has one.
+"""
+
+import mimetypes
+import os
+import re
+
+from pathlib import Path
+from urllib.parse import quote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from tickets.storage import ContentAddressedStorage
+
+
+RANGE_HEADER = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+# size of the chunks read from the file for a byte range response
+RANGE_CHUNK_SIZE = 64 * 1024
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# other files (raw uploads waiting for processing) may be replaced: caches revalidate them with the ETag
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def file_etag(name: str, stat: os.stat_result) -> str:
+    """Strong ETag of a media file: the hash in the name of a blob, the size and modification time otherwise."""
+    if ContentAddressedStorage.is_blob(name):
+        return f'"{os.path.basename(name).split(".")[0]}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def requested_range(request: HttpRequest, size: int, etag: str, last_modified: int) -> tuple[int, int] | None:
+    """
+    Return the (start, end) bytes (end included) of the Range header of request, or None to send the whole file:
+    no Range header, several ranges, or an If-Range header matching an older version of the file.
+
+    :raises ValueError: when the range cannot be satisfied
+    """
+    match = RANGE_HEADER.match(request.headers.get("Range", "").replace(" ", ""))
+    if match is None or not (match["start"] or match["end"]):
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    if not match["start"]:
+        # bytes=-N: the last N bytes
+        start, end = max(size - int(match["end"]), 0), size - 1
+    else:
+        start = int(match["start"])
+        end = min(int(match["end"]), size - 1) if match["end"] else size - 1
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range {match.group()} for {size} bytes")
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request: HttpRequest, name: str) -> HttpResponse:
+    """Serve the file name of MEDIA_ROOT."""
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError) as error:
+        raise Http404(f"{name} not found") from error
+    if not os.path.isfile(path):
+        raise Http404(f"{name} not found")
+
+    etag = file_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, path, stat.st_size, etag, last_modified)
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if ContentAddressedStorage.is_blob(name) else REVALIDATE_CACHE_CONTROL
+    )
+    return response
+
+
+def sendfile_header_value(path: str) -> str:
+    """
+    Value of the settings.MEDIA_SENDFILE_HEADER header sending the file path of MEDIA_ROOT.
+
+    Uploads keep the name given by their user, which may contain spaces or non-ASCII characters: the value is
+    percent-encoded, as a header value is ASCII. nginx decodes the URI of X-Accel-Redirect, Apache (mod_xsendfile,
+    XSendFileUnescape on by default) and lighttpd decode the path of X-Sendfile.
+    """
+    if settings.MEDIA_SENDFILE_HEADER == "X-Accel-Redirect":
+        relative_path = Path(os.path.relpath(path, settings.MEDIA_ROOT)).as_posix()
+        return settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(relative_path)
+    return quote(Path(path).as_posix())
+
+
+def _file_response(request: HttpRequest, path: str, size: int, etag: str, last_modified: int) -> HttpResponse:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if settings.MEDIA_SENDFILE_HEADER:
+        # the front server reads the file, ranges included, from the path given in the header
+        response = HttpResponse(content_type=content_type)
+        response.headers[settings.MEDIA_SENDFILE_HEADER] = sendfile_header_value(path)
+        return response
+
+    try:
+        byte_range = requested_range(request, size, etag, last_modified)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        return FileResponse(open(path, "rb"), content_type=content_type)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+    response.headers["Content-Length"] = str(end - start + 1)
+    response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+class MediaMiddleware:
+    """
+    Serve the requests under MEDIA_URL with serve_media(), skipping the middlewares placed after this one.
+    Must be placed before the session and authentication middlewares.
+
+    Under ASGI, serve_media() runs in a thread of its own, so its file system calls do not block the event loop
+    nor queue behind the sync views, which share a single thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def is_media_request(request: HttpRequest) -> bool:
+        return request.method in ("GET", "HEAD") and request.path.startswith(settings.MEDIA_URL)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if self.is_media_request(request):
+            try:
+                return serve_media(request, request.path.removeprefix(settings.MEDIA_URL))
+            except Http404:
+                # answered by the 404 view, as any other missing page
+                pass
+        return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if self.is_media_request(request):
+            try:
+                return await sync_to_async(serve_media, thread_sensitive=False)(
+                    request, request.path.removeprefix(settings.MEDIA_URL)
+                )
+            except Http404:
+                pass
+        return await self.get_response(request)
@@ -1,5 +1,13 @@
 from typing import TYPE_CHECKING
 
+from django.contrib.auth.views import redirect_to_login
+from django.http import StreamingHttpResponse
+from django.template.loader import select_template
+
+from litrevu.database import write_transaction
+from litrevu.jinja2 import stream_template
+from litrevu.routers import ais_pinned_to_primary, is_pinned_to_primary, read_from_replica, replica_iterator
+
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
@@ -27,3 +35,110 @@ class UserOwnershipMixin:
         queryset = super().get_queryset()
         filter_kwargs = {self.user_field: self.request.user}
         return queryset.filter(**filter_kwargs)
+
+
+class StreamingTemplateResponseMixin:
+    """
+    Mixin for TemplateResponseMixin views rendering a Jinja2 template as a StreamingHttpResponse.
+
+    The beginning of the page (head, header) is sent while the rest of the context is still evaluated,
+    which improves time-to-first-byte and keeps memory usage flat for long pages.
+    Streaming can be turned off per view with the streaming attribute.
+
+    Usage:
+        class MyListView(StreamingTemplateResponseMixin, ListView):
+            template_name = "my_app/my_template.html"
+            # ...
+    """
+
+    request: "HttpRequest"
+    streaming: bool = True
+
+    def render_to_response(self, context, **response_kwargs):
+        if not self.streaming:
+            return super().render_to_response(context, **response_kwargs)
+
+        template = select_template(self.get_template_names(), using="jinja2")
+        response_kwargs.setdefault("content_type", "text/html; charset=utf-8")
+        return StreamingHttpResponse(stream_template(template, context, self.request), **response_kwargs)
+
+
+class WriteTransactionMixin:
+    """
+    Mixin for form views (CreateView, UpdateView, DeleteView) saving their object in a write transaction,
+    started in IMMEDIATE mode, retried while the database is locked (see litrevu.database.write_transaction).
+
+    Usage:
+        class MyCreateView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
+            model = MyModel
+            # ...
+    """
+
+    def form_valid(self, form):
+        return write_transaction(super().form_valid)(form)
+
+
+class ReplicaReadMixin:
+    """
+    Mixin for read-only views reading from the replica database, if one is configured (see litrevu.routers).
+
+    GET and HEAD requests read from the replica, unless the session has just written and is pinned
+    to the primary. The response is rendered, or streamed, reading from the replica as well.
+    Place it after LoginRequiredMixin, so the user is loaded from the primary.
+
+    Usage:
+        class MyListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
+            model = MyModel
+            # ...
+    """
+
+    request: "HttpRequest"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or is_pinned_to_primary(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        with read_from_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                # template responses are rendered later by the handler, outside of this block
+                response.render()
+
+        if response.streaming:
+            response.streaming_content = replica_iterator(response.streaming_content)
+        return response
+
+
+class AsyncLoginRequiredMixin:
+    """
+    LoginRequiredMixin for async views: the user is loaded with request.auser(), which does not block the event loop,
+    and request.user is replaced by the loaded user, so it can be read from async code.
+
+    Usage:
+        class MyAsyncView(AsyncLoginRequiredMixin, View):
+            async def get(self, request, *args, **kwargs):
+                # ...
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncReplicaReadMixin:
+    """
+    ReplicaReadMixin for async views: GET and HEAD requests read from the replica, if one is configured,
+    unless the session is pinned to the primary. Async views render their response before returning it.
+    Place it after AsyncLoginRequiredMixin, so the user is loaded from the primary.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or await ais_pinned_to_primary(request):
+            return await super().dispatch(request, *args, **kwargs)
+
+        with read_from_replica():
+            return await super().dispatch(request, *args, **kwargs)
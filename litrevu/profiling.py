@@ -0,0 +1,238 @@
+"""
+Per request profiling: SQL queries, template rendering and image processing times.
+
+ProfilingMiddleware stores the metrics of the current request in a context variable, filled by:
+    - a wrapper of the SQL queries, installed on every database connection (see install_query_timer),
+    - timed() blocks, around template rendering (litrevu.jinja2) and image processing (tickets.models).
+They are sent in a Server-Timing header and logged once the response has been sent.
+"""
+
+import cProfile
+import logging
+import random
+import time
+
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+
+logger = logging.getLogger("profiling")
+
+
+@dataclass
+class RequestMetrics:
+    """Times are in seconds."""
+
+    start: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    image_time: float = 0.0
+
+    @property
+    def total_time(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing header, durations being in milliseconds."""
+        return ", ".join(
+            (
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template_time * 1000:.1f}",
+                f"img;dur={self.image_time * 1000:.1f}",
+                f"total;dur={self.total_time * 1000:.1f}",
+            )
+        )
+
+
+_current_metrics: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def timed(metric: str):
+    """
+    Add the time spent in the block to metric ("template_time" or "image_time") of the current request.
+    SQL queries run in the block are not counted, they are already in db_time.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start, db_time = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (metrics.db_time - db_time)
+        setattr(metrics, metric, getattr(metrics, metric) + elapsed)
+
+
+def timed_iterator(chunks: Iterable[str], metric: str) -> Iterator[str]:
+    """Add the time spent producing each chunk to metric, e.g. for a template rendered by Template.generate()."""
+    iterator = iter(chunks)
+    while True:
+        with timed(metric):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver adding the query timer to every new database connection."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class ProfilingMiddleware:
+    """
+    Measure each request and report it in a Server-Timing header and in a log line.
+
+    Streamed responses (feed pages) run most of their queries and rendering while their content is sent:
+    their Server-Timing header only covers the time until the headers, the log line covers the whole response.
+
+    When settings.PROFILING_SLOW_REQUEST_MS is set, a share (settings.PROFILING_SAMPLE_RATE) of the requests
+    run under cProfile, and the profiles of the requests slower than the threshold are dumped in
+    settings.PROFILING_DUMP_DIR, to be read with pstats or snakeviz.
+
+    Under ASGI, the middleware runs in the event loop, so the async views are not moved to a thread. The metrics
+    reach the sync code run in threads (ORM queries, template rendering), which inherits the context variable,
+    but async requests are not run under cProfile: a profiler only sees the thread it was enabled in.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        profiler = self._start_profiler()
+
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+            if profiler:
+                profiler.disable()
+
+        response["Server-Timing"] = metrics.server_timing()
+
+        if response.streaming:
+            response.streaming_content = self._profiled_stream(
+                response.streaming_content, request, response, metrics, profiler
+            )
+        else:
+            self._report(request, response, metrics, profiler)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        response["Server-Timing"] = metrics.server_timing()
+
+        if response.streaming and response.is_async:
+            response.streaming_content = self._ameasured_stream(response.streaming_content, request, response, metrics)
+        elif response.streaming:
+            # a sync iterator, consumed in a thread by Django
+            response.streaming_content = self._profiled_stream(
+                response.streaming_content, request, response, metrics, None
+            )
+        else:
+            self._report(request, response, metrics, None)
+        return response
+
+    def _start_profiler(self) -> cProfile.Profile | None:
+        if settings.PROFILING_SLOW_REQUEST_MS is None or random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return None
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # a single profiler can run at a time, another request is being profiled
+            return None
+        return profiler
+
+    def _profiled_stream(self, chunks, request, response, metrics, profiler) -> Iterator[bytes]:
+        """Measure the production of each chunk of a streamed response, then report the request."""
+        iterator = iter(chunks)
+        while True:
+            token = _current_metrics.set(metrics)
+            if profiler:
+                profiler.enable()
+            try:
+                chunk = next(iterator, None)
+            finally:
+                if profiler:
+                    profiler.disable()
+                _current_metrics.reset(token)
+
+            if chunk is None:
+                break
+            yield chunk
+
+        self._report(request, response, metrics, profiler)
+
+    async def _ameasured_stream(self, chunks, request, response, metrics) -> AsyncIterator[bytes]:
+        """Async version of _profiled_stream(), for async iterators, which are not profiled."""
+        iterator = aiter(chunks)
+        while True:
+            token = _current_metrics.set(metrics)
+            try:
+                chunk = await anext(iterator, None)
+            finally:
+                _current_metrics.reset(token)
+
+            if chunk is None:
+                break
+            yield chunk
+
+        self._report(request, response, metrics, None)
+
+    def _report(self, request, response, metrics: RequestMetrics, profiler: cProfile.Profile | None):
+        total_ms = metrics.total_time * 1000
+        logger.info(
+            f"method={request.method} path={request.path} status={response.status_code} "
+            f"total_ms={total_ms:.1f} queries={metrics.queries} db_ms={metrics.db_time * 1000:.1f} "
+            f"template_ms={metrics.template_time * 1000:.1f} image_ms={metrics.image_time * 1000:.1f}"
+        )
+
+        if profiler and total_ms >= settings.PROFILING_SLOW_REQUEST_MS:
+            settings.PROFILING_DUMP_DIR.mkdir(parents=True, exist_ok=True)
+            name = f"{timezone.now():%Y%m%d-%H%M%S-%f}{request.path.replace('/', '_')}.prof"
+            profiler.dump_stats(settings.PROFILING_DUMP_DIR / name)
+            logger.warning(f"Slow request {request.path} ({total_ms:.0f}ms), profile dumped to {name}")
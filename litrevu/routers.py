@@ -0,0 +1,120 @@
+"""
+Read/write routing between the primary database ("default") and an optional read replica ("replica").
+
+Writes always go to the primary. Reads go to the replica only inside read_from_replica() blocks,
+entered by the read-only views (see litrevu.mixins.ReplicaReadMixin), and only when a replica is configured.
+
+The replica lags behind the primary: after a write request, ReplicaPinMiddleware pins the session to
+the primary for settings.REPLICA_PIN_SECONDS, so users read their own writes.
+"""
+
+import time
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponse
+
+
+REPLICA_DB_ALIAS = "replica"
+
+# session key of the time until which the reads of the session go to the primary
+PIN_SESSION_KEY = "_pin_primary_until"
+
+# sessions must be read from the primary: a session created since the last sync would be lost
+PRIMARY_ONLY_APPS = {"sessions"}
+
+_read_from_replica: ContextVar[bool] = ContextVar("read_from_replica", default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    """Send the reads of the block to the replica, if one is configured."""
+    token = _read_from_replica.set(replica_configured())
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def replica_iterator(chunks: Iterable) -> Iterator:
+    """Produce each chunk of an iterator (e.g. a streamed response) reading from the replica."""
+    iterator = iter(chunks)
+    while True:
+        with read_from_replica():
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def is_pinned_to_primary(request: HttpRequest) -> bool:
+    return request.session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+async def ais_pinned_to_primary(request: HttpRequest) -> bool:
+    """Async version of is_pinned_to_primary(), for async views."""
+    return await request.session.aget(PIN_SESSION_KEY, 0) > time.time()
+
+
+class ReplicaRouter:
+    """Database router sending the reads of read_from_replica() blocks to the replica, the rest to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica is a copy of the primary, their objects can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is copied from the primary, schema included (see sync_replica command)
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin the session to the primary database for settings.REPLICA_PIN_SECONDS after a write request
+    (any method but GET, HEAD, OPTIONS and TRACE), so the next pages show what was just written.
+    Must be placed after SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def pins(request: HttpRequest) -> bool:
+        return replica_configured() and request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        if self.pins(request):
+            request.session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        response = await self.get_response(request)
+        if self.pins(request):
+            await request.session.aset(PIN_SESSION_KEY, time.time() + settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,262 @@
+"""
+Pre-forking WSGI server, used to serve the site in production (see the serve command).
+
+The master process loads Django once, then forks workers which inherit the loaded application:
+the memory of the imported modules, compiled templates and url patterns is shared copy-on-write.
+Each worker accepts connections on the shared listening socket and handles one request at a time.
+
+Signals sent to the master:
+    - SIGTERM, SIGINT: graceful shutdown, workers finish their current request then exit.
+    - SIGHUP: graceful reload, the master re-executes itself to load the new code, forks new workers
+      on the same socket, then stops the previous workers gracefully: no connection is refused.
+"""
+
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from contextlib import suppress
+
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connections
+
+from tickets.tasks import shutdown_executor
+
+
+logger = logging.getLogger("server")
+
+# environment variables passing the listening socket and the previous workers through a reload
+LISTENER_FD_ENV = "LITREVU_SERVER_FD"
+
+# seconds a worker waits for a connection before checking whether it has to stop
+ACCEPT_TIMEOUT = 1
+PREVIOUS_WORKERS_ENV = "LITREVU_SERVER_PREVIOUS_WORKERS"
+
+
+class CountingWSGIServer(WSGIServer):
+    """Django's development WSGI server, serving one request at a time, counting the requests it handled."""
+
+    requests_handled = 0
+    request_timeout = None
+
+    def finish_request(self, request, client_address):
+        super().finish_request(request, client_address)
+        self.requests_handled += 1
+
+
+class TimeoutWSGIRequestHandler(WSGIRequestHandler):
+    """
+    Django's request handler, giving up on the clients which send nothing for request_timeout seconds:
+    a worker serves one connection at a time, an idle or slow client would block it.
+    """
+
+    @property
+    def timeout(self) -> float:
+        # socket timeout, set by StreamRequestHandler.setup()
+        return self.server.request_timeout
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except TimeoutError:
+            logger.warning(f"Connection from {self.client_address[0]} idle for {self.timeout}s, closed")
+            self.close_connection = True
+
+
+class Worker:
+    """Serve requests from the listening socket, in a forked process, until stopped or recycled."""
+
+    def __init__(self, application, listener: socket.socket, max_requests: int, timeout: float | None = None):
+        self.application = application
+        self.listener = listener
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Ctrl+C is sent to the whole process group, the master stops the workers itself
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        host, port = self.listener.getsockname()[:2]
+        server = CountingWSGIServer((host, port), TimeoutWSGIRequestHandler, bind_and_activate=False)
+        server.request_timeout = self.timeout
+        # serve on the inherited socket rather than on the one created by the server
+        server.socket.close()
+        server.socket = self.listener
+        server.server_name, server.server_port = socket.getfqdn(host), port
+        server.setup_environ()
+        server.set_app(self.application)
+        # wake up regularly to check whether the worker has to stop
+        server.timeout = ACCEPT_TIMEOUT
+
+        parent_pid = os.getppid()
+        while not self.stopping and server.requests_handled < self.max_requests:
+            server.handle_request()
+            if os.getppid() != parent_pid:
+                logger.warning(f"Worker {os.getpid()}: master exited, stopping")
+                break
+
+        # the worker exits with os._exit(), skipping the atexit handlers: let the image conversions submitted by
+        # its requests finish and be stored, or their tickets would stay in processing state
+        shutdown_executor(wait=True)
+        connections.close_all()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+
+class PreforkServer:
+    """
+    Master process: preload the application, fork workers and keep their number constant.
+
+    :param application: The WSGI application, loaded before forking.
+    :param bind: The (host, port) address to listen on.
+    :param workers: The number of worker processes.
+    :param max_requests: A worker is replaced after this number of requests, to bound memory leaks
+                         (0: never). A random jitter is added so workers are not all recycled at once.
+    :param max_requests_jitter: The maximum jitter added to max_requests.
+    :param graceful_timeout: Seconds given to workers to finish their current request when stopping.
+    :param timeout: Seconds after which a worker closes a connection on which the client sends nothing.
+    """
+
+    def __init__(
+        self,
+        application,
+        bind: tuple[str, int],
+        workers: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30,
+        timeout: float | None = None,
+    ):
+        self.application = application
+        self.bind = bind
+        self.workers_count = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.timeout = timeout
+        self.workers: set[int] = set()
+        self.stopping = False
+        self.reloading = False
+
+    def listen(self) -> socket.socket:
+        """Open the listening socket, or take over the one of the master before a reload."""
+        if LISTENER_FD_ENV in os.environ:
+            listener = socket.socket(fileno=int(os.environ.pop(LISTENER_FD_ENV)))
+        else:
+            listener = socket.create_server(self.bind, backlog=2048)
+        # a timeout rather than a non-blocking socket: handle_request() waits for min(socket timeout, server
+        # timeout), 0 would make the idle workers spin. accept() fails after the timeout, instead of blocking,
+        # when another worker took the connection first
+        listener.settimeout(ACCEPT_TIMEOUT)
+        listener.set_inheritable(True)
+        return listener
+
+    def run(self):
+        self.listener = self.listen()
+        host, port = self.listener.getsockname()[:2]
+        logger.info(f"Master {os.getpid()} listening on http://{host}:{port} with {self.workers_count} workers")
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+
+        # nothing opened by the master may be shared by the workers
+        connections.close_all()
+        # objects allocated so far are never collected: the garbage collector of the workers does not
+        # touch them, so their memory pages stay shared
+        gc.freeze()
+
+        for _ in range(self.workers_count):
+            self.spawn_worker()
+        self.stop_previous_workers()
+
+        while not self.stopping and not self.reloading:
+            self.reap_workers()
+            while len(self.workers) < self.workers_count and not self.stopping:
+                self.spawn_worker()
+            time.sleep(0.2)
+
+        if self.reloading:
+            self.reexecute()
+        self.stop_workers()
+
+    def spawn_worker(self):
+        max_requests = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else 0
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return
+
+        status = 0
+        try:
+            random.seed()
+            Worker(self.application, self.listener, max_requests or sys.maxsize, self.timeout).run()
+        except Exception:
+            logger.exception(f"Worker {os.getpid()} crashed")
+            status = 1
+        finally:
+            # never return into the master's code
+            os._exit(status)
+
+    def reap_workers(self):
+        """Forget the workers which exited: recycled after max_requests, crashed or stopped by a previous master."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                exit_code = os.waitstatus_to_exitcode(status)
+                if exit_code and not self.stopping:
+                    logger.warning(f"Worker {pid} exited with code {exit_code}")
+
+    def stop_workers(self):
+        """Ask the workers to finish their current request, and kill those still running after graceful_timeout."""
+        for pid in self.workers:
+            self._kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+
+        for pid in self.workers:
+            logger.warning(f"Worker {pid} did not stop in {self.graceful_timeout}s, killed")
+            self._kill(pid, signal.SIGKILL)
+        logger.info(f"Master {os.getpid()} stopped")
+
+    def reexecute(self):
+        """Replace the master by a new one running the current code, which takes over the socket and the workers."""
+        logger.info(f"Master {os.getpid()} reloading")
+        os.environ[LISTENER_FD_ENV] = str(self.listener.fileno())
+        os.environ[PREVIOUS_WORKERS_ENV] = ",".join(map(str, self.workers))
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+
+    def stop_previous_workers(self):
+        """After a reload, stop the workers of the previous master, once the new ones are serving."""
+        previous_workers = os.environ.pop(PREVIOUS_WORKERS_ENV, "")
+        for pid in filter(None, previous_workers.split(",")):
+            self._kill(int(pid), signal.SIGTERM)
+
+    @staticmethod
+    def _kill(pid: int, signum: int):
+        with suppress(ProcessLookupError):
+            os.kill(pid, signum)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _reload(self, signum, frame):
+        self.reloading = True
@@ -21,6 +21,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Media files (uploaded by users)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# media files are served by litrevu.media.MediaMiddleware. With a front server, set MEDIA_SENDFILE_HEADER to
+# "X-Accel-Redirect" (nginx, internal location MEDIA_ACCEL_REDIRECT_LOCATION aliased to MEDIA_ROOT) or "X-Sendfile"
+# (Apache, lighttpd), the front server then sends the file, Django only checking the request
+MEDIA_SENDFILE_HEADER = os.environ.get("MEDIA_SENDFILE_HEADER", "")
+MEDIA_ACCEL_REDIRECT_LOCATION = os.environ.get("MEDIA_ACCEL_REDIRECT_LOCATION", "/protected-media/")
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -44,16 +49,25 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     # custom app
+    # project wide commands, templates and static files
+    "litrevu",
     "users",
     "authentication",
     "tickets",
     "reviews",
     "feed",
+    "search",
 ]
 
 MIDDLEWARE = [
+    # first, so it measures the whole request
+    "litrevu.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # before SessionMiddleware, media files are served without session nor authentication
+    "litrevu.media.MediaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # after SessionMiddleware, it stores the pin in the session
+    "litrevu.routers.ReplicaPinMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -67,7 +81,8 @@ ROOT_URLCONF = "litrevu.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.jinja2.Jinja2",
+        # Django Jinja2 backend, measuring the rendering time of templates
+        "BACKEND": "litrevu.jinja2.Jinja2",
         # even with APP_DIRS = True,
         "DIRS": [
             BASE_DIR / "litrevu" / "jinja2",
@@ -75,7 +90,7 @@ TEMPLATES = [
         ],
         "APP_DIRS": True,
         "OPTIONS": {
-            "auto_reload": True,
+            # auto_reload and bytecode_cache are set by the environment, according to JINJA2_PROFILE
             "environment": "litrevu.jinja2.environment",
             "context_processors": [
                 "django.template.context_processors.request",
@@ -105,13 +120,64 @@ WSGI_APPLICATION = "litrevu.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# "development": SQLite defaults, one connection per request
+# "production": SQLITE_PRODUCTION_PRAGMAS applied to each new connection (see litrevu.database),
+# and connections kept open between requests
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "development")
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    # readers do not block the writer, and the writer does not block readers
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "wal"),
+    # with WAL, NORMAL only syncs on checkpoints: a power loss may lose the last transactions, not corrupt the db
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "normal"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # negative values are in KiB
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64 * 1024)),
+    # milliseconds a connection waits for a lock before failing with "database is locked"
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "memory"),
+}
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if DATABASE_PROFILE == "production" else {}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "data" / "db.sqlite3",
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", 600)) if DATABASE_PROFILE == "production" else 0,
+        "CONN_HEALTH_CHECKS": DATABASE_PROFILE == "production",
     }
 }
 
+# read replica, used by the read-only views (see litrevu.routers), e.g. DATABASE_REPLICA_NAME=data/replica.sqlite3
+# locally, the replica is a copy of the primary refreshed by the sync_replica command
+if os.environ.get("DATABASE_REPLICA_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / os.environ["DATABASE_REPLICA_NAME"],
+        # tests use the primary as replica, the replica being a copy
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["litrevu.routers.ReplicaRouter"]
+# after a write request, the reads of the session go to the primary for this long (seconds), the replica lagging
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+
+# write paths decorated with litrevu.database.write_transaction retry starting their transaction this many times when
+# the database is locked, after a random delay of up to WRITE_TRANSACTION_BACKOFF * 2^attempt seconds (capped to 1s)
+WRITE_TRANSACTION_RETRIES = int(os.environ.get("WRITE_TRANSACTION_RETRIES", 5))
+WRITE_TRANSACTION_BACKOFF = float(os.environ.get("WRITE_TRANSACTION_BACKOFF", 0.05))
+
+# Serving
+# pre-forking server of the container (litrevu.server, serve command): number of worker processes, each one handling
+# one request at a time. Workers are replaced after SERVE_MAX_REQUESTS requests (0: never), plus a random jitter of
+# up to SERVE_MAX_REQUESTS_JITTER so they are not all replaced at once, and get SERVE_GRACEFUL_TIMEOUT seconds to
+# finish their current request on stop or reload. A worker serving one connection at a time, it closes the
+# connections on which the client sends nothing for SERVE_TIMEOUT seconds
+SERVE_WORKERS = int(os.environ.get("SERVE_WORKERS", 2 * (os.cpu_count() or 1) + 1))
+SERVE_MAX_REQUESTS = int(os.environ.get("SERVE_MAX_REQUESTS", 1000))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get("SERVE_MAX_REQUESTS_JITTER", 100))
+SERVE_GRACEFUL_TIMEOUT = float(os.environ.get("SERVE_GRACEFUL_TIMEOUT", 30))
+SERVE_TIMEOUT = float(os.environ.get("SERVE_TIMEOUT", 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,11 +214,114 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = "static/"
-STATICFILES_DIRS = [
-    BASE_DIR / "litrevu" / "static",
-]
+# litrevu/static is found as the static directory of the litrevu app
 STATIC_ROOT = BASE_DIR / "static"
 
+# "production": collectstatic bundles, minifies, hashes and precompresses the static files (see litrevu.staticfiles),
+# templates link the bundles and the serve command serves the collected files. "development": files served as they are
+STATIC_PROFILE = os.environ.get("STATIC_PROFILE", "development")
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "litrevu.staticfiles.BundlingManifestStorage"
+            if STATIC_PROFILE == "production"
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        )
+    },
+}
+# CSS bundles linked by the templates with bundle_links(name): one file per bundle with the production profile
+STATIC_BUNDLES = {
+    "base": [
+        "styles/theme/reset.css",
+        "styles/theme/colors.css",
+        "styles/theme/font-face.css",
+        "styles/theme/typography.css",
+        "styles/theme/spacing.css",
+        "styles/theme/scaling.css",
+        "styles/theme/layout.css",
+        "styles/theme/border.css",
+        "styles/css/base.css",
+        "styles/css/header.css",
+        "styles/css/footer.css",
+    ],
+    "form": ["styles/components/button.css", "styles/components/form.css"],
+    "review_form": ["styles/components/button.css", "styles/components/form.css", "styles/components/star_rating.css"],
+    "posts": ["styles/components/button.css", "styles/components/card.css", "styles/components/star_rating.css"],
+    # styles/css/base.css is in the "base" bundle, linked by every page
+    "feed": ["styles/components/button.css", "styles/components/card.css", "styles/components/star_rating.css"],
+    "search": ["styles/components/button.css", "styles/components/card.css", "styles/components/form.css"],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# a local memory cache is only shared by the threads of one process: with several processes (serve command),
+# CACHE_BACKEND=file shares the cache through files of CACHE_DIR, so an invalidation is seen by all of them
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+CACHE_DIR = Path(os.environ.get("CACHE_DIR", BASE_DIR / "data" / "cache"))
+
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_DIR,
+        # one follow graph entry per user, plus the template fragments
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 10000))},
+    },
+}
+
+CACHES = {
+    "default": CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+
+# Jinja2 templates
+# "development": templates are checked on each render and recompiled when they change
+# "production": templates are never checked, and are loaded compiled from JINJA2_BYTECODE_CACHE_DIR,
+# filled when the image is built (see litrevu/management/commands/compile_templates.py)
+JINJA2_PROFILE = os.environ.get("JINJA2_PROFILE", "development")
+JINJA2_BYTECODE_CACHE_DIR = BASE_DIR / "jinja2_cache"
+
+
+# Feed
+# read feeds from the materialized timelines (feed.models.FeedEntry) instead of merging tickets and reviews on the fly
+FEED_MATERIALIZED_TIMELINE = True
+FEED_PAGE_SIZE = 20
+# send feed pages as streamed responses, their posts being fetched by chunks of FEED_CHUNK_SIZE during rendering
+FEED_STREAMING_RENDER = True
+FEED_CHUNK_SIZE = 5
+# serve the feed, user posts and subscriptions pages with their async views (feed.views), when deployed with ASGI
+FEED_ASYNC_VIEWS = os.environ.get("FEED_ASYNC_VIEWS", "false").lower() == "true"
+# cached follow graph (feed.follow_graph.FollowGraph) entries expire after this delay (seconds) even if not invalidated
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+# "who to follow" suggestions (feed.suggestions): the best ones of each user are stored by the
+# compute_follow_suggestions command, and the subscriptions page shows the first ones not followed yet
+FOLLOW_SUGGESTIONS_STORED = 20
+FOLLOW_SUGGESTIONS_DISPLAYED = 5
+# rendered post cards ({% cache %} blocks of the templates) are kept this long (seconds), their keys change on edit
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Search
+SEARCH_PAGE_SIZE = 20
+
+
+# Tickets
+# store uploaded images as is, and convert them in a local process pool instead of the request thread
+TICKET_IMAGE_ASYNC_PROCESSING = True
+TICKET_IMAGE_WORKERS = 2
+
+
+# Profiling (litrevu.profiling.ProfilingMiddleware)
+# when set, requests slower than this (milliseconds) have their cProfile stats dumped in PROFILING_DUMP_DIR
+PROFILING_SLOW_REQUEST_MS = None
+# share of the requests run under cProfile when PROFILING_SLOW_REQUEST_MS is set, profiling slows them down
+PROFILING_SAMPLE_RATE = 1.0
+PROFILING_DUMP_DIR = BASE_DIR / "logs" / "profiles"
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -204,6 +373,31 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
         },
+        "search": {
+            "handlers": ["file", "console"],
+            "level": "DEBUG",
+            "propagate": False,
+        },
+        "profiling": {
+            "handlers": ["file", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "database": {
+            "handlers": ["file", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "server": {
+            "handlers": ["file", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "staticfiles": {
+            "handlers": ["file", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
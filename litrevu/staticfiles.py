@@ -0,0 +1,153 @@
+"""
+Static files pipeline of the production static profile (settings.STATIC_PROFILE), run by collectstatic.
+
+    - the CSS bundles of settings.STATIC_BUNDLES are concatenated and minified into BUNDLES_DIR,
+    - every file gets a content-hashed name recorded in the manifest, resolved by the Jinja2 static() global,
+      so the files can be cached forever by browsers,
+    - text files get precompressed .gz and .br siblings (.br only when the brotli package is installed),
+      served by CollectedStaticFilesHandler to the clients accepting them.
+"""
+
+import gzip
+import logging
+import mimetypes
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import HttpRequest
+from django.views.static import serve
+
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger("staticfiles")
+
+BUNDLES_DIR = "styles/bundles"
+
+# extensions of the files worth compressing, images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".txt", ".json", ".html"}
+
+# (Content-Encoding, file suffix), in order of preference
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_SPACES = re.compile(r"\s+")
+CSS_SPACES_AROUND_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+CSS_RELATIVE_URL = re.compile(r"""url\(\s*(['"]?)(?![a-z]+:|/|#|data:)([^'")]+)\1\s*\)""", re.IGNORECASE)
+
+
+def bundle_path(name: str) -> str:
+    return f"{BUNDLES_DIR}/{name}.css"
+
+
+def minify_css(css: str) -> str:
+    """Remove the comments and the useless spaces and semicolons of a stylesheet."""
+    css = CSS_COMMENT.sub("", css)
+    css = CSS_SPACES.sub(" ", css)
+    css = CSS_SPACES_AROUND_PUNCTUATION.sub(r"\1", css)
+    return css.replace(": ", ":").replace(";}", "}").strip()
+
+
+def rebase_css_urls(css: str, source_path: str, target_path: str) -> str:
+    """Rewrite the relative url() of a stylesheet moved from source_path to target_path."""
+
+    def rebase(match: re.Match) -> str:
+        quote, url = match.groups()
+        absolute_url = posixpath.normpath(posixpath.join(posixpath.dirname(source_path), url))
+        return f"url({quote}{posixpath.relpath(absolute_url, posixpath.dirname(target_path))}{quote})"
+
+    return CSS_RELATIVE_URL.sub(rebase, css)
+
+
+class BundlingManifestStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage building the CSS bundles before hashing the files, and compressing them afterwards.
+
+    Bundles are hashed like the other files, their url() references (fonts) being replaced by hashed names.
+    """
+
+    def url(self, name, force=False):
+        # the files of the production profile are the collected ones, whatever DEBUG
+        return super().url(name, force=True)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        for name, sources in settings.STATIC_BUNDLES.items():
+            paths[bundle_path(name)] = (self, self.build_bundle(name, sources, paths))
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        for hashed_name in set(self.hashed_files.values()):
+            if posixpath.splitext(hashed_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                self.compress(hashed_name)
+
+    def build_bundle(self, name: str, sources: list[str], paths: dict) -> str:
+        """Concatenate and minify the sources of a bundle, and return the path of the bundle."""
+        path = bundle_path(name)
+        contents = []
+        for source in sources:
+            storage, source_path = paths[source]
+            with storage.open(source_path) as source_file:
+                contents.append(rebase_css_urls(source_file.read().decode(), source, path))
+        bundle = minify_css("\n".join(contents))
+
+        self._replace(path, bundle.encode())
+        logger.info(f"Bundle {path}: {len(sources)} files, {len(bundle)} bytes")
+        return path
+
+    def compress(self, name: str):
+        """Write the .gz and .br siblings of a file, when they are smaller than the file."""
+        with self.open(name) as original_file:
+            content = original_file.read()
+
+        compressed_variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed_variants[".br"] = brotli.compress(content, mode=brotli.MODE_TEXT)
+
+        for suffix, compressed in compressed_variants.items():
+            if len(compressed) < len(content):
+                self._replace(name + suffix, compressed)
+
+    def _replace(self, name: str, content: bytes):
+        # save() would pick another name if the file already exists
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+
+class CollectedStaticFilesHandler(StaticFilesHandler):
+    """
+    WSGI handler serving the collected static files (STATIC_ROOT) of the production static profile,
+    with their precompressed variant when the client accepts it, and cached forever as their names are hashed.
+    """
+
+    def serve(self, request: HttpRequest):
+        path = self.file_path(request.path)
+        accepted_encodings = request.headers.get("Accept-Encoding", "")
+
+        encoding = None
+        served_path = path
+        for candidate_encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if candidate_encoding in accepted_encodings and staticfiles_storage.exists(path + suffix):
+                encoding, served_path = candidate_encoding, path + suffix
+                break
+
+        response = serve(request, served_path, document_root=settings.STATIC_ROOT)
+        if encoding:
+            response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            response.headers["Content-Encoding"] = encoding
+            del response.headers["Content-Disposition"]
+        response.headers["Vary"] = "Accept-Encoding"
+        if path in staticfiles_storage.hashed_files.values():
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
@@ -15,13 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import RedirectView
 
-from litrevu import settings
-
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -35,8 +32,6 @@ urlpatterns = [
     path("reviews/", include("reviews.urls")),
     # --- Feed app ---
     path("feed/", include("feed.urls")),
+    # --- Search app ---
+    path("search/", include("search.urls")),
 ]
-
-# serve images in debug mode from media folder on demand
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+        ('tickets', '0008_ticket_time_edited'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='time_edited',
+            field=models.DateTimeField(auto_now=True, verbose_name='Edited the'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_review_time_edited_alter_review_ticket'),
+        ('tickets', '0009_ticket_ticket_user_timeline_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-time_created'], name='review_user_timeline_idx'),
+        ),
+    ]
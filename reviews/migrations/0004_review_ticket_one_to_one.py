@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_reviews(apps, schema_editor):
+    """
+    Keep only the first review of each ticket, the others would violate the unique constraint of the one-to-one
+    field. Their feed entries and search index rows, created by the feed and search migrations, are deleted too.
+    """
+    Review = apps.get_model("reviews", "Review")
+    FeedEntry = apps.get_model("feed", "FeedEntry")
+
+    first_reviews_ids = Review.objects.values("ticket").annotate(first_id=Min("id")).values("first_id")
+    duplicates_ids = list(Review.objects.exclude(id__in=first_reviews_ids).values_list("id", flat=True))
+    if not duplicates_ids:
+        return
+
+    FeedEntry.objects.filter(kind="review", post_id__in=duplicates_ids).delete()
+    with schema_editor.connection.cursor() as cursor:
+        # rowid of the row of a review in the search index, see search.index.SearchIndex.rowid
+        cursor.executemany("DELETE FROM search_post WHERE rowid = %s", [[review_id * 2 + 1] for review_id in duplicates_ids])
+    Review.objects.filter(id__in=duplicates_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_review_user_timeline_idx'),
+        ('feed', '0003_feedentry'),
+        ('search', '0002_post_rowid'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='review',
+            name='ticket',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review', to='tickets.ticket'),
+        ),
+    ]
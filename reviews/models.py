@@ -24,6 +24,9 @@ class Review(models.Model):
     :type user: ForeignKey
     :ivar time_created: The timestamp indicating when the review was created.
     :type time_created: datetime
+    :ivar time_edited: The timestamp indicating when the review was last changed, used to invalidate
+                       its cached rendering.
+    :type time_edited: datetime
     """
 
     title = models.CharField("Title", max_length=128)
@@ -32,11 +35,21 @@ class Review(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="reviews")
     ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, related_name="review")
     time_created = models.DateTimeField("Created the", auto_now_add=True)
+    time_edited = models.DateTimeField("Edited the", auto_now=True)
 
     class Meta:
         ordering = ["-time_created"]
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
+        indexes = [
+            # reviews of a user (or of the users of a feed) newest first, without sorting
+            models.Index(fields=["user", "-time_created"], name="review_user_timeline_idx"),
+        ]
 
     def __str__(self):
         return f"Review: {self.title}"
+
+    @property
+    def cache_version(self) -> str:
+        """Version of the content of the review and of its ticket, displayed with it."""
+        return f"{self.time_edited.isoformat()}/{self.ticket.cache_version}"
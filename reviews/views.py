@@ -1,37 +1,57 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, UpdateView
 
-from litrevu.mixins import UserOwnershipMixin
+from litrevu.mixins import UserOwnershipMixin, WriteTransactionMixin
 from tickets.models import Ticket
 
 from .form import ReviewForm
 from .models import Review
 
 
-class ReviewCreateView(LoginRequiredMixin, CreateView):
+class ReviewCreateView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
     model = Review
     form_class = ReviewForm
     template_name = "reviews/review_form.html"
     success_url = reverse_lazy("feed:user_posts")
 
+    def get_ticket(self):
+        """Get the reviewed ticket once per request, annotated with its review flag."""
+        if not hasattr(self, "ticket"):
+            self.ticket = get_object_or_404(Ticket.objects.with_review_flag(), pk=self.kwargs.get("ticket_id"))
+        return self.ticket
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        ticket_id = self.kwargs.get("ticket_id")
-        if ticket_id:
-            context["ticket"] = get_object_or_404(Ticket, pk=ticket_id)
+        context["ticket"] = self.get_ticket()
         return context
 
     def form_valid(self, form):
+        ticket = self.get_ticket()
+        if ticket.has_review:
+            return self.review_conflict(form)
+
         form.instance.user = self.request.user
-        ticket_id = self.kwargs.get("ticket_id")
-        if ticket_id:
-            form.instance.ticket = get_object_or_404(Ticket, pk=ticket_id)
-        return super().form_valid(form)
+        form.instance.ticket = ticket
+        try:
+            return super().form_valid(form)
+        except IntegrityError:
+            # another user reviewed the ticket between the check above and the insert
+            if not Review.objects.filter(ticket=ticket).exists():
+                raise
+            return self.review_conflict(form)
+
+    def review_conflict(self, form):
+        """Display the form again with a 409 Conflict status, the ticket having been reviewed by someone else."""
+        form.add_error(None, "This ticket has already been reviewed, your review could not be saved.")
+        response = self.form_invalid(form)
+        response.status_code = 409
+        return response
 
 
-class ReviewUpdateView(LoginRequiredMixin, UserOwnershipMixin, UpdateView):
+class ReviewUpdateView(LoginRequiredMixin, UserOwnershipMixin, WriteTransactionMixin, UpdateView):
     model = Review
     template_name = "reviews/review_form.html"
     form_class = ReviewForm
@@ -45,7 +65,7 @@ class ReviewUpdateView(LoginRequiredMixin, UserOwnershipMixin, UpdateView):
         return context
 
 
-class ReviewDeleteView(LoginRequiredMixin, UserOwnershipMixin, DeleteView):
+class ReviewDeleteView(LoginRequiredMixin, UserOwnershipMixin, WriteTransactionMixin, DeleteView):
     model = Review
     template_name = "reviews/reviews_confirm_delete.html"
     context_object_name = "review"
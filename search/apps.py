@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "search"
+
+    def ready(self):
+        # connect signal receivers keeping the search index in sync with tickets and reviews
+        from . import signals  # noqa: F401
@@ -0,0 +1,170 @@
+import logging
+import re
+
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from markupsafe import Markup, escape
+
+from feed.follow_graph import FollowGraph
+from feed.services import REVIEW, TICKET, FeedService
+from reviews.models import Review
+from tickets.models import Ticket
+
+
+logger = logging.getLogger("search")
+
+# FTS5 virtual table, created by the migrations of the search app
+SEARCH_TABLE = "search_post"
+
+# bounds of the matched terms in snippets, replaced by <mark> tags once the snippet is escaped
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+SNIPPET_TOKENS = 16
+
+# the rowid of the row of a post is derived from its kind and id, so a post is updated or removed by rowid
+# instead of a scan of the table, the other columns being stored but not indexed
+ROWID_KIND_BITS = {TICKET: 0, REVIEW: 1}
+
+# bm25() weights of the columns of the table (kind, post_id, user_id, ticket_user_id, title, content):
+# a term found in a title counts more than in a content
+BM25_WEIGHTS = (0.0, 0.0, 0.0, 0.0, 4.0, 1.0)
+
+
+@dataclass
+class SearchHit:
+    """A post matching a search, with an extract of its text around the matched terms."""
+
+    post: Ticket | Review
+    snippet: str
+
+    @property
+    def highlighted_snippet(self) -> Markup:
+        return (
+            escape(self.snippet)
+            .replace(MATCH_START, Markup('<mark class="bold">'))
+            .replace(MATCH_END, Markup("</mark>"))
+        )
+
+
+class SearchIndex:
+    """
+    Service class maintaining and querying the full-text index of tickets and reviews.
+
+    The index is an SQLite FTS5 table with one row per post: its title and content are indexed,
+    its kind, id, author and the author of its ticket (for a review) are only stored, to apply
+    the visibility rules of the feed to the hits. Rows are ranked with bm25.
+    The rowid of a row is computed from the kind and id of its post (see rowid()).
+    """
+
+    @staticmethod
+    def rowid(kind: str, post_id: int) -> int:
+        return post_id * 2 + ROWID_KIND_BITS[kind]
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """
+        Convert the text typed by a user into an FTS5 query matching posts containing all its words.
+        Each word is quoted, so the FTS5 syntax (operators, columns filters...) can not be used by users.
+        """
+        return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+    @staticmethod
+    def _index(kind: str, post_id: int, user_id: int, ticket_user_id: int, title: str, content: str):
+        rowid = SearchIndex.rowid(kind, post_id)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, kind, post_id, user_id, ticket_user_id, title, content) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [rowid, kind, post_id, user_id, ticket_user_id, title, content],
+            )
+
+    @staticmethod
+    def index_ticket(ticket: Ticket):
+        SearchIndex._index(TICKET, ticket.id, ticket.user_id, ticket.user_id, ticket.title, ticket.content)
+
+    @staticmethod
+    def index_review(review: Review):
+        SearchIndex._index(REVIEW, review.id, review.user_id, review.ticket.user_id, review.title, review.content)
+
+    @staticmethod
+    def remove(kind: str, post_id: int):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [SearchIndex.rowid(kind, post_id)])
+
+    @staticmethod
+    def rebuild() -> int:
+        """Rebuild the index from scratch and return the number of posts indexed."""
+        tickets_table = Ticket._meta.db_table
+        reviews_table = Review._meta.db_table
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, kind, post_id, user_id, ticket_user_id, title, content) "
+                f"SELECT id * 2 + %s, %s, id, user_id, user_id, title, content FROM {tickets_table}",
+                [ROWID_KIND_BITS[TICKET], TICKET],
+            )
+            indexed = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, kind, post_id, user_id, ticket_user_id, title, content) "
+                f"SELECT review.id * 2 + %s, %s, review.id, review.user_id, ticket.user_id, review.title, "
+                f"review.content "
+                f"FROM {reviews_table} AS review JOIN {tickets_table} AS ticket ON ticket.id = review.ticket_id",
+                [ROWID_KIND_BITS[REVIEW], REVIEW],
+            )
+            indexed += cursor.rowcount
+
+        # merge the index segments written by the inserts
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+        logger.info(f"Search index rebuilt with {indexed} posts.")
+        return indexed
+
+    @staticmethod
+    def search(user, query: str, limit: int, offset: int = 0) -> tuple[list[SearchHit], bool]:
+        """
+        Search the posts visible in the feed of a user, best hits first:
+            - tickets and reviews of the user and of the users they follow,
+            - reviews in response to the user's tickets, even if the reviewer is not followed.
+
+        :return: The hits of the page and whether there are more hits after them
+        """
+        match_expression = SearchIndex.match_expression(query)
+        if not match_expression:
+            return [], False
+
+        users_ids = [user.id, *FollowGraph.followed_ids(user.id)]
+        users_placeholders = ", ".join(["%s"] * len(users_ids))
+        weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT kind, post_id, snippet({SEARCH_TABLE}, -1, %s, %s, '…', %s) "
+                f"FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s "
+                f"AND (user_id IN ({users_placeholders}) OR (kind = %s AND ticket_user_id = %s)) "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}), kind DESC, post_id DESC "
+                # fetch one extra row to know if there is a next page
+                "LIMIT %s OFFSET %s",
+                [
+                    *(MATCH_START, MATCH_END, SNIPPET_TOKENS),
+                    match_expression,
+                    *users_ids,
+                    *(REVIEW, user.id),
+                    *(limit + 1, offset),
+                ],
+            )
+            rows = [{"kind": kind, "post_id": post_id, "snippet": snippet} for kind, post_id, snippet in cursor]
+
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+
+        snippets = {(row["kind"], row["post_id"]): row["snippet"] for row in rows}
+        hits = [
+            SearchHit(post, snippets[(TICKET if isinstance(post, Ticket) else REVIEW, post.id)])
+            for post in FeedService.hydrate(rows)
+        ]
+        return hits, has_next
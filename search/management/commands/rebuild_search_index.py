@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.index import SearchIndex
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of tickets and reviews from scratch"
+
+    def handle(self, *args, **options):
+        indexed = SearchIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt with {indexed} posts"))
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+# one row per ticket or review, only the title and content are indexed
+CREATE_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE search_post USING fts5(
+    kind UNINDEXED,
+    post_id UNINDEXED,
+    user_id UNINDEXED,
+    ticket_user_id UNINDEXED,
+    title,
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+FILL_SEARCH_TABLE = """
+INSERT INTO search_post (kind, post_id, user_id, ticket_user_id, title, content)
+SELECT 'ticket', id, user_id, user_id, title, content FROM tickets_ticket
+UNION ALL
+SELECT 'review', review.id, review.user_id, ticket.user_id, review.title, review.content
+FROM reviews_review AS review JOIN tickets_ticket AS ticket ON ticket.id = review.ticket_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('reviews', '0002_review_time_edited_alter_review_ticket'),
+        ('tickets', '0008_ticket_time_edited'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEARCH_TABLE, "DROP TABLE search_post"),
+        migrations.RunSQL(FILL_SEARCH_TABLE, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+# the rows are inserted again with a rowid derived from the kind and id of their post (see SearchIndex.rowid)
+REFILL_SEARCH_TABLE = """
+INSERT INTO search_post (rowid, kind, post_id, user_id, ticket_user_id, title, content)
+SELECT id * 2, 'ticket', id, user_id, user_id, title, content FROM tickets_ticket
+UNION ALL
+SELECT review.id * 2 + 1, 'review', review.id, review.user_id, ticket.user_id, review.title, review.content
+FROM reviews_review AS review JOIN tickets_ticket AS ticket ON ticket.id = review.ticket_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(["DELETE FROM search_post", REFILL_SEARCH_TABLE], migrations.RunSQL.noop),
+    ]
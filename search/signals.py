@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from feed.services import REVIEW, TICKET
+from reviews.models import Review
+from tickets.models import Ticket
+
+from .index import SearchIndex
+
+
+@receiver(post_save, sender=Ticket)
+def index_ticket(sender, instance, **kwargs):
+    SearchIndex.index_ticket(instance)
+
+
+@receiver(post_save, sender=Review)
+def index_review(sender, instance, **kwargs):
+    SearchIndex.index_review(instance)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_from_index(sender, instance, **kwargs):
+    SearchIndex.remove(TICKET, instance.id)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_index(sender, instance, **kwargs):
+    SearchIndex.remove(REVIEW, instance.id)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import TemplateView
+
+from .index import SearchIndex
+
+
+class SearchView(LoginRequiredMixin, TemplateView):
+    """
+    Full-text search over the tickets and reviews visible in the feed of the user.
+    The query is given by the "q" GET parameter and the page number by the "page" one.
+    """
+
+    template_name = "search/search_results.html"
+    page_size: int = settings.SEARCH_PAGE_SIZE
+
+    def get_page_number(self) -> int:
+        try:
+            return max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            return 1
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        page_number = self.get_page_number()
+
+        hits, has_next = SearchIndex.search(
+            self.request.user, query, self.page_size, offset=(page_number - 1) * self.page_size
+        )
+
+        context.update(
+            {
+                "query": query,
+                "hits": hits,
+                "page_number": page_number,
+                "has_next": has_next,
+            }
+        )
+        return context
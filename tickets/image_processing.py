@@ -0,0 +1,68 @@
+"""
+Image conversion of ticket uploads.
+
+This module only depends on Pillow, so its functions can run in worker processes
+without loading Django.
+"""
+
+import hashlib
+import io
+
+from typing import NamedTuple
+
+from PIL import Image
+
+
+# maximum width and height of each variant, from the largest to the smallest
+VARIANTS_SIZES = {
+    "full": 500,
+    "card": 200,
+    "thumbnail": 100,
+}
+WEBP_QUALITY = 85
+
+
+class Variant(NamedTuple):
+    data: bytes
+    width: int
+
+
+def render_variants(source) -> dict[str, Variant]:
+    """
+    Process an uploaded image into WebP variants of VARIANTS_SIZES:
+    - Decode the image once
+    - Resize it to fit each size while maintaining aspect ratio, from the largest to the smallest,
+      each variant being resized from the previous one
+    - Convert each variant to WebP and optimize quality
+
+    :param source: A file path or a file object opened in binary mode
+    :return: The WebP bytes and the width of each variant, by variant name
+    """
+    variants = {}
+
+    # create a copy of the image in memory
+    with Image.open(source) as image:
+        image.load()
+
+        for name, size in VARIANTS_SIZES.items():
+            # resize the image, it never enlarges it
+            image.thumbnail((size, size))
+
+            # create an empty buffer to store the image
+            with io.BytesIO() as output:
+                # save the image in the buffer with new format
+                image.save(output, format="webp", quality=WEBP_QUALITY, optimize=True)
+                variants[name] = Variant(output.getvalue(), image.width)
+
+    return variants
+
+
+def render_file_variants(path: str) -> tuple[str, dict[str, Variant]]:
+    """
+    Entry point of the worker processes: render the variants of the image stored at path.
+
+    :return: The SHA-256 of the file and its variants
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    return hashlib.sha256(data).hexdigest(), render_variants(io.BytesIO(data))
@@ -0,0 +1,102 @@
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from tickets.models import ImageBlob, Ticket
+from tickets.storage import get_ticket_image_storage
+
+
+TICKETS_DIR = "tickets"
+
+
+def walk_files(directory: Path) -> list[Path]:
+    """Every file under directory."""
+    files = []
+    for root, _, names in os.walk(directory):
+        files.extend(Path(root) / name for name in names)
+    return files
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the files of MEDIA_ROOT/tickets that no ticket references: images left behind by a crash, "
+        "an interrupted upload or a failed transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List the orphan files without deleting them")
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=3600,
+            help="Only delete files older than this (seconds): recent files may belong to a ticket being saved",
+        )
+        parser.add_argument("--workers", type=int, default=8, help="Number of threads walking and deleting files")
+
+    def handle(self, *args, **options):
+        storage = get_ticket_image_storage()
+        root = Path(storage.path(TICKETS_DIR))
+        if not root.is_dir():
+            self.stdout.write(self.style.SUCCESS("No ticket files"))
+            return
+
+        # listed before the references are read: a file created meanwhile is recent, hence kept by --min-age
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            subdirectories = [entry for entry in root.iterdir() if entry.is_dir()]
+            files = [path for path in root.iterdir() if path.is_file()]
+            for subdirectory_files in executor.map(walk_files, subdirectories):
+                files.extend(subdirectory_files)
+
+        referenced = self.referenced_names()
+        min_mtime = time.time() - options["min_age"]
+        media_root = Path(storage.location)
+
+        orphans = []
+        for path in files:
+            name = path.relative_to(media_root).as_posix()
+            if name in referenced:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # deleted meanwhile, e.g. a raw upload replaced by its processed blob
+                continue
+            if stat.st_mtime < min_mtime:
+                orphans.append((name, stat.st_size))
+
+        for name, _ in orphans:
+            if options["dry_run"] or options["verbosity"] >= 2:
+                self.stdout.write(name)
+        if not options["dry_run"]:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                list(executor.map(storage.delete, (name for name, _ in orphans)))
+
+        freed = sum(size for _, size in orphans)
+        action = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(files)} files checked, {len(orphans)} orphans {action} ({freed / 1024:.0f} KiB)")
+        )
+
+    @staticmethod
+    def referenced_names() -> set[str]:
+        """
+        Names of the files used by tickets, and of the files of the image blobs.
+
+        A blob is kept as long as its row exists, even if no ticket uses it: the row may be acquired by the next
+        upload of the same image, and its files are deleted when its last reference is released.
+        """
+        referenced = set()
+        for image, variants in Ticket.objects.exclude(image="").values_list("image", "image_variants").iterator():
+            if image:
+                referenced.add(image)
+            referenced.update(variant["name"] for variant in variants.values())
+
+        for name, variants in ImageBlob.objects.values_list("name", "variants").iterator():
+            referenced.add(name)
+            referenced.update(variant["name"] for variant in variants.values())
+
+        return referenced
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from tickets.models import Ticket
+from tickets.tasks import process_ticket_image, shutdown_executor
+
+
+class Command(BaseCommand):
+    help = "Process ticket images left in processing state, e.g. after a restart of the server"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing-variants",
+            action="store_true",
+            help="Also process the images uploaded before variants were generated",
+        )
+
+    def handle(self, *args, **options):
+        pending = Q(image_status=Ticket.ImageStatus.PROCESSING)
+        if options["missing_variants"]:
+            pending |= Q(image_variants={}) & ~Q(image="") & Q(image__isnull=False)
+
+        pending_tickets = Ticket.objects.filter(pending).values_list("id", "image")
+
+        count = 0
+        for ticket_id, image_name in pending_tickets.iterator():
+            process_ticket_image(ticket_id, image_name)
+            count += 1
+
+        # wait for the conversions to be done before leaving
+        shutdown_executor(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f"{count} ticket images processed"))
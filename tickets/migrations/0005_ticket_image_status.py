@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_alter_ticket_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('processing', 'Processing')], default='ready', max_length=10, verbose_name='Image status'),
+        ),
+    ]
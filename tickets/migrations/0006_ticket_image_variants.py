@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Image variants'),
+        ),
+    ]
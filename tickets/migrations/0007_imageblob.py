@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:00
+
+import tickets.models
+import tickets.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_ticket_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='Digest')),
+                ('raw_digest', models.CharField(db_index=True, max_length=64, verbose_name='Raw digest')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Name')),
+                ('variants', models.JSONField(default=dict, verbose_name='Variants')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='References count')),
+            ],
+            options={
+                'verbose_name': 'Image blob',
+                'verbose_name_plural': 'Image blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=tickets.storage.get_ticket_image_storage, upload_to=tickets.models.ticket_image_upload_path, verbose_name='Image'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='time_edited',
+            field=models.DateTimeField(auto_now=True, verbose_name='Edited the'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_ticket_time_edited'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', '-time_created'], name='ticket_user_timeline_idx'),
+        ),
+    ]
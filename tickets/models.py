@@ -1,16 +1,21 @@
-import io
 import logging
-import os
 import uuid
 
-from pathlib import Path
+from functools import partial
 
+from django.apps import apps
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.db import models
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef
 from django.db.models.signals import post_delete, pre_save
 from django.dispatch import receiver
-from PIL import Image
+
+from litrevu.profiling import timed
+
+from .image_processing import render_variants
+from .storage import ContentAddressedStorage, file_digest, get_ticket_image_storage
+from .tasks import process_ticket_image
 
 
 logger = logging.getLogger("tickets")
@@ -21,6 +26,98 @@ def ticket_image_upload_path(instance: "Ticket", filename: str):
     return f"tickets/user_{instance.user.id}/{uuid.uuid4()}-{filename}"
 
 
+class ImageBlobManager(models.Manager):
+    def acquire(self, raw_digest: str) -> "ImageBlob | None":
+        """Take a reference on the blob processed from an upload, if this upload has already been processed."""
+        blob = self.filter(raw_digest=raw_digest).first()
+        if blob is None or not self.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1):
+            return None
+        return blob
+
+    def store(self, variants: dict, raw_digest: str) -> "ImageBlob":
+        """Save the variants of a processed upload, unless identical ones exist, and take a reference on them."""
+        digest, stored_variants = get_ticket_image_storage().save_variants(variants)
+
+        blob, _ = self.get_or_create(
+            digest=digest,
+            defaults={"raw_digest": raw_digest, "name": stored_variants["full"]["name"], "variants": stored_variants},
+        )
+        self.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        return blob
+
+    def release(self, name: str):
+        """
+        Drop a reference on the blob whose full variant is name.
+        The blob is deleted when no ticket references it anymore, and its files once the transaction is committed.
+        """
+        with transaction.atomic():
+            if not self.filter(name=name, ref_count__gt=0).update(ref_count=F("ref_count") - 1):
+                return
+
+            blob = self.filter(name=name, ref_count=0).first()
+            if blob is None:
+                return
+
+            blob.delete()
+            transaction.on_commit(partial(self._delete_files, blob.digest, blob.variants))
+
+    def _delete_files(self, digest: str, variants: dict):
+        # the same image may have been uploaded again since the blob was released
+        if self.filter(digest=digest).exists():
+            return
+
+        storage = get_ticket_image_storage()
+        for variant in variants.values():
+            storage.delete(variant["name"])
+
+
+class ImageBlob(models.Model):
+    """
+    Represents a processed image stored once, whatever the number of tickets using it.
+
+    Its files are named after the hash of the full variant (see tickets.storage.ContentAddressedStorage),
+    so identical images are deduplicated. The hash of the upload which produced it is also kept, so uploading
+    the same file again does not decode it.
+
+    :ivar digest: The SHA-256 of the full variant.
+    :type digest: str
+    :ivar raw_digest: The SHA-256 of the uploaded file processed into this blob.
+    :type raw_digest: str
+    :ivar name: The file name of the full variant, used as Ticket.image.
+    :type name: str
+    :ivar variants: The variants of the image, used as Ticket.image_variants.
+    :type variants: dict
+    :ivar ref_count: The number of tickets using this blob.
+    :type ref_count: int
+    """
+
+    digest = models.CharField("Digest", max_length=64, unique=True)
+    raw_digest = models.CharField("Raw digest", max_length=64, db_index=True)
+    name = models.CharField("Name", max_length=255, unique=True)
+    variants = models.JSONField("Variants", default=dict)
+    ref_count = models.PositiveIntegerField("References count", default=0)
+
+    objects = ImageBlobManager()
+
+    class Meta:
+        verbose_name = "Image blob"
+        verbose_name_plural = "Image blobs"
+
+    def __str__(self):
+        return f"Image blob: {self.digest}"
+
+
+class TicketQuerySet(models.QuerySet):
+    def with_review_flag(self):
+        """
+        Annotate each ticket with review_exists, used by Ticket.has_review.
+        It avoids one query per ticket when has_review is checked for a list of tickets.
+        """
+        # Review model is loaded from the registry as reviews.models imports this module
+        review_model = apps.get_model("reviews", "Review")
+        return self.annotate(review_exists=Exists(review_model.objects.filter(ticket=OuterRef("pk"))))
+
+
 class Ticket(models.Model):
     """
     Represents a support ticket or post that can be created by a user.
@@ -38,101 +135,198 @@ class Ticket(models.Model):
     :type content: str
     :ivar image: An optional image associated with the ticket.
     :type image: ImageField
+    :ivar image_status: Whether the image is ready to be displayed or still being processed
+         in the background.
+    :type image_status: str
+    :ivar image_variants: The resized copies of the image, by variant name (full, card, thumbnail),
+         each one described by its file name and its width.
+    :type image_variants: dict
     :ivar user: The user associated with the ticket. This is a foreign key reference
          to the user model specified in project settings.
     :type user: ForeignKey
     :ivar time_created: The date and time when the ticket was created. Automatically
          assigned when the ticket is created.
     :type time_created: datetime
+    :ivar time_edited: The date and time when the ticket was last changed, used to invalidate
+         its cached rendering.
+    :type time_edited: datetime
     """
 
+    class ImageStatus(models.TextChoices):
+        READY = "ready", "Ready"
+        PROCESSING = "processing", "Processing"
+
     title = models.CharField("Title", max_length=128)
     content = models.TextField("Content", max_length=2048, blank=True)
-    image = models.ImageField("Image", upload_to=ticket_image_upload_path, blank=True, null=True)
+    image = models.ImageField(
+        "Image", upload_to=ticket_image_upload_path, storage=get_ticket_image_storage, blank=True, null=True
+    )
+    image_status = models.CharField(
+        "Image status", max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY
+    )
+    image_variants = models.JSONField("Image variants", default=dict, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tickets")
     time_created = models.DateTimeField("Created the", auto_now_add=True)
+    time_edited = models.DateTimeField("Edited the", auto_now=True)
+
+    objects = TicketQuerySet.as_manager()
 
     class Meta:
         ordering = ["-time_created"]
         verbose_name = "Ticket"
         verbose_name_plural = "Tickets"
+        indexes = [
+            # tickets of a user (or of the users of a feed) newest first, without sorting
+            models.Index(fields=["user", "-time_created"], name="ticket_user_timeline_idx"),
+        ]
 
     def __str__(self):
         return f"Ticket: {self.title}"
 
     @property
     def has_review(self):
-        """Check if this ticket already has at least one review."""
-        return self.review.exists()
+        """
+        Check if this ticket already has a review.
+        Use the review_exists annotation when the ticket comes from TicketQuerySet.with_review_flag().
+        """
+        if hasattr(self, "review_exists"):
+            return self.review_exists
+
+        try:
+            return self.review is not None
+        except ObjectDoesNotExist:
+            return False
+
+    @property
+    def cache_version(self) -> str:
+        """Version of the content of the ticket, part of the keys of its cached fragments."""
+        return self.time_edited.isoformat()
+
+    @property
+    def image_is_processing(self):
+        return self.image_status == self.ImageStatus.PROCESSING
+
+    @property
+    def image_srcset(self):
+        """Value of the srcset attribute of the image, listing its variants with their widths."""
+        storage = self._meta.get_field("image").storage
+        return ", ".join(
+            f"{storage.url(variant['name'])} {variant['width']}w" for variant in self.image_variants.values()
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the image as loaded, so saving the ticket releases the image it replaces without reading it again
+        if "image" in instance.__dict__ and "image_variants" in instance.__dict__:
+            instance._loaded_image = (instance.__dict__["image"], instance.__dict__["image_variants"])
+        return instance
 
     def save(self, *args, **kwargs):
-        """Override save to also process image."""
+        """
+        Override save to also process image.
+
+        An upload which has already been processed reuses the stored blob. Otherwise,
+        with settings.TICKET_IMAGE_ASYNC_PROCESSING, the raw upload is stored as is and converted
+        in the background once the transaction is committed, or it is converted right away.
+        """
+        process_in_background = False
+
         # Process image only if it's a new upload
         if self.image and hasattr(self.image, "_committed") and not self.image._committed:
-            processed_image = self._process_image(self.image)
-            if processed_image:
-                self.image = processed_image
+            # the upload takes its own reference on its blob: the loaded image is released even when the same
+            # image is uploaded again (see delete_ticket_image_on_change)
+            self._image_uploaded = True
+            raw_digest = file_digest(self.image.file)
+            blob = ImageBlob.objects.acquire(raw_digest)
+
+            if blob:
+                self.image, self.image_variants = blob.name, blob.variants
+                self.image_status = self.ImageStatus.READY
+            elif settings.TICKET_IMAGE_ASYNC_PROCESSING:
+                self.image_status = self.ImageStatus.PROCESSING
+                process_in_background = True
+            else:
+                variants = self._process_image(self.image)
+                if variants:
+                    blob = ImageBlob.objects.store(variants, raw_digest)
+                    self.image, self.image_variants = blob.name, blob.variants
+
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._image_uploaded = False
+        self._loaded_image = (self.image.name, self.image_variants)
 
-        super().save(*args, **kwargs)
+        if process_in_background:
+            transaction.on_commit(partial(process_ticket_image, self.pk, self.image.name))
 
     def _process_image(self, image_file):
         """
-        Process the uploaded image:
-        - Convert to WebP
-        - Resize to fit max_size while maintaining aspect ratio
-        - Optimize quality
+        Render the WebP variants of the uploaded image (see tickets.image_processing.render_variants).
+        Return None if the image can not be processed, the original file is then kept.
         """
         try:
             # Reset file pointer to beginning
             image_file.file.seek(0)
-            # create a copy of the image in memory
-            with Image.open(image_file.file) as image:
-                # resize the image
-                image.thumbnail((500, 500))
+            with timed("image_time"):
+                return render_variants(image_file.file)
 
-                # create an empty buffer to store the image
-                with io.BytesIO() as output:
-                    # save the image in the buffer with new format
-                    image.save(output, format="webp", quality=85, optimize=True)
+        except Exception as error:
+            logger.error(f"Error processing image: {error}")
+            return None
 
-                    # Generate new filename
-                    original_name = image_file.name
-                    name_without_ext = Path(original_name).stem
-                    new_name = f"{name_without_ext}.webp"
 
-                    # Create new ContentFile
-                    return ContentFile(output.getvalue(), name=new_name)
+def release_image(name: str | None, variants: dict):
+    """
+    Release an image of a ticket: a blob is deleted once no ticket references it,
+    a raw upload or an image stored before blobs is deleted with its variants.
+    Files are deleted once the transaction is committed, so a rollback keeps them.
+    """
+    if not name:
+        return
+
+    if ContentAddressedStorage.is_blob(name):
+        ImageBlob.objects.release(name)
+    else:
+        names = {name, *(variant["name"] for variant in variants.values())}
+        transaction.on_commit(partial(_delete_image_files, names))
 
-        except Exception as error:
-            logger.error(f"Error processing image: {error}")
-            # if failed return original file
-            return image_file
+
+def _delete_image_files(names: set[str]):
+    storage = get_ticket_image_storage()
+    for name in names:
+        storage.delete(name)
 
 
 @receiver(post_delete, sender=Ticket)
 def delete_ticket_image_on_delete(sender, instance, **kwargs):
     """
-    Delete image file from filesystem when Ticket object is deleted.
+    Release image from filesystem when Ticket object is deleted.
     """
-    if instance.image and os.path.isfile(instance.image.path):
-        os.remove(instance.image.path)
+    release_image(instance.image.name, instance.image_variants)
 
 
 @receiver(pre_save, sender=Ticket)
 def delete_ticket_image_on_change(sender, instance, **kwargs):
     """
-    Delete old image file from filesystem when Ticket image is updated.
+    Release old image from filesystem when Ticket image is updated.
+
+    The old image is the one the ticket was loaded with (see Ticket.from_db), it is only read from the database
+    when unknown, or when it was a raw upload: the background processing may have swapped it for a blob since.
     """
     if not instance.pk:
         # New instance, no old image to delete
         return
 
-    try:
-        old_instance = Ticket.objects.get(pk=instance.pk)
-    except Ticket.DoesNotExist:
-        # Instance doesn't exist yet
-        return
+    old_image = getattr(instance, "_loaded_image", None)
+    if old_image is None or (old_image[0] and not ContentAddressedStorage.is_blob(old_image[0])):
+        old_image = Ticket.objects.filter(pk=instance.pk).values_list("image", "image_variants").first()
+        if old_image is None:
+            # Instance doesn't exist yet
+            return
 
-    # Check if image has changed
-    if old_instance.image and old_instance.image != instance.image and os.path.isfile(old_instance.image.path):
-        os.remove(old_instance.image.path)
+    # Check if image has changed, or has been uploaded again: the upload took another reference on the same blob
+    old_name, old_variants = old_image
+    if old_name and (old_name != instance.image.name or getattr(instance, "_image_uploaded", False)):
+        release_image(old_name, old_variants)
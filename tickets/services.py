@@ -1,9 +1,10 @@
 import logging
 
 from django.contrib.auth import get_user_model
-from django.db import DatabaseError, transaction
+from django.db import DatabaseError, OperationalError
 from django.forms import inlineformset_factory
 
+from litrevu.database import write_transaction
 from reviews.form import ReviewForm
 from reviews.models import Review
 
@@ -48,43 +49,13 @@ class TicketReviewService:
         errors = []
 
         try:
-            # use transaction.atomic context to delete all read or write request to db if an error occurs
-            with transaction.atomic():
-                # reminder, self.object is a Ticket instance (cf. view class attribute)
-                # first validate and save Ticket instance as it is the parent in Ticket-Review relationship
-                # complete from form data, link it to the current user and save it in db
-
-                # Create and save ticket
-                ticket = ticket_form.save(commit=False)
-                ticket.user = user
-                ticket.save()
-
-                # Validate review formset
-                if not review_formset.is_valid():
-                    # collect errors
-                    errors.extend(review_formset.non_form_errors())
-                    for form in review_formset:
-                        if form.errors:
-                            # extract error messages
-                            for field, error_list in form.errors.items():
-                                errors.append(f"{field}: {', '.join(error_list)}")
-
-                    logger.error(f"Review formset validation failed: {errors}")
-
-                    # raise exception to rollback transaction
-                    raise DatabaseError("Review validation failed")
-
-                # Process review formset
-                # pass above Ticket instance to ReviewFormSet instance retrieved in context
-                review_formset.instance = ticket
-                # Review instances are already linked to Ticket instance thanks to inlineformset_factory
-                reviews = review_formset.save(commit=False)
-
-                for review in reviews:
-                    review.user = user
-                    review.save()
-
-                return True, ticket, errors
+            ticket = TicketReviewService._save_ticket_with_review(ticket_form, review_formset, user, errors)
+            return True, ticket, errors
+
+        except OperationalError as error:
+            # the database stayed locked by other writers, in spite of the retries
+            logger.error(f"Database busy while creating ticket with review for user {user.username}: {error}")
+            return False, None, ["The service is busy, please try again in a moment."]
 
         except DatabaseError:
             # rollback transaction and return error message
@@ -94,6 +65,50 @@ class TicketReviewService:
             logger.error(f"Error creating ticket with review for user {user.username}: {error}")
             return False, None, [f"An error occurred: {error}"]
 
+    @staticmethod
+    @write_transaction
+    def _save_ticket_with_review(ticket_form, review_formset, user, errors: list) -> Ticket:
+        """
+        Save the ticket and its review in a write transaction (see litrevu.database.write_transaction),
+        which rolls back both if an error occurs and waits for the write lock before saving them.
+        Raise DatabaseError if the review formset is invalid, its errors being added to errors.
+        """
+        # reminder, self.object is a Ticket instance (cf. view class attribute)
+        # first validate and save Ticket instance as it is the parent in Ticket-Review relationship
+        # complete from form data, link it to the current user and save it in db
+
+        # Create and save ticket
+        ticket = ticket_form.save(commit=False)
+        ticket.user = user
+        ticket.save()
+
+        # Validate review formset
+        if not review_formset.is_valid():
+            # collect errors
+            errors.extend(review_formset.non_form_errors())
+            for form in review_formset:
+                if form.errors:
+                    # extract error messages
+                    for field, error_list in form.errors.items():
+                        errors.append(f"{field}: {', '.join(error_list)}")
+
+            logger.error(f"Review formset validation failed: {errors}")
+
+            # raise exception to rollback transaction
+            raise DatabaseError("Review validation failed")
+
+        # Process review formset
+        # pass above Ticket instance to ReviewFormSet instance retrieved in context
+        review_formset.instance = ticket
+        # Review instances are already linked to Ticket instance thanks to inlineformset_factory
+        reviews = review_formset.save(commit=False)
+
+        for review in reviews:
+            review.user = user
+            review.save()
+
+        return ticket
+
     @staticmethod
     def prepare_context(context: dict, formset_class, title: str, request, instance=None):
         """
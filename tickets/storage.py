@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+
+from .image_processing import Variant
+
+
+BLOBS_DIR = "tickets/blobs"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage of ticket images.
+
+    Processed images are stored as blobs named after the SHA-256 of their content, in directories sharded
+    by the first characters of the hash: tickets/blobs/ab/cd/abcd...ef.webp. A blob is written once,
+    however many tickets use it, and its content never changes for a given name.
+    Raw uploads waiting for processing are stored as regular files (see ticket_image_upload_path).
+    """
+
+    @staticmethod
+    def blob_name(digest: str, suffix: str = "", extension: str = ".webp") -> str:
+        return f"{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}{extension}"
+
+    @staticmethod
+    def is_blob(name: str) -> bool:
+        return name.startswith(f"{BLOBS_DIR}/")
+
+    def save_blob(self, name: str, data: bytes) -> str:
+        """
+        Write a blob, unless it already exists.
+        The file is written in a temporary file then renamed, so a blob is never seen partially written.
+        """
+        path = Path(self.path(name))
+        if path.exists():
+            return name
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary_file:
+            temporary_file.write(data)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporary_file.name, self.file_permissions_mode)
+        os.replace(temporary_file.name, path)
+
+        return name
+
+    def save_variants(self, variants: dict[str, Variant]) -> tuple[str, dict]:
+        """
+        Save the WebP variants of an image as blobs named after the hash of the full variant.
+
+        :param variants: The variants rendered by tickets.image_processing.render_variants
+        :return: The hash of the full variant and a dict describing every variant,
+            to be stored in Ticket.image_variants
+        """
+        digest = hashlib.sha256(variants["full"].data).hexdigest()
+
+        stored_variants = {}
+        for variant_name, variant in variants.items():
+            suffix = "" if variant_name == "full" else f"-{variant_name}"
+            name = self.save_blob(self.blob_name(digest, suffix), variant.data)
+            stored_variants[variant_name] = {"name": name, "width": variant.width}
+
+        return digest, stored_variants
+
+
+def get_ticket_image_storage() -> ContentAddressedStorage:
+    return ticket_image_storage
+
+
+def file_digest(file) -> str:
+    """SHA-256 of an uploaded file, read by chunks."""
+    sha256 = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+ticket_image_storage = ContentAddressedStorage()
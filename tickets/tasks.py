@@ -0,0 +1,104 @@
+import logging
+import multiprocessing
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .image_processing import render_file_variants
+
+
+logger = logging.getLogger("tickets")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Return the process pool converting ticket images, created on first use.
+    Workers are spawned (not forked) so they do not inherit the state of the web process.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.TICKET_IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """Stop the process pool, waiting by default for the pending conversions to finish."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def process_ticket_image(ticket_id: int, raw_name: str):
+    """
+    Render the variants of the raw image of a ticket in the background, then swap them in.
+    If the pool is not available, the conversion is done in the current thread.
+    """
+    storage = apps.get_model("tickets", "Ticket")._meta.get_field("image").storage
+
+    try:
+        future = get_executor().submit(render_file_variants, storage.path(raw_name))
+    except Exception as error:
+        logger.error(f"Image processing pool unavailable, processing ticket {ticket_id} image in place: {error}")
+        future = Future()
+        try:
+            future.set_result(render_file_variants(storage.path(raw_name)))
+        except Exception as conversion_error:
+            future.set_exception(conversion_error)
+
+    future.add_done_callback(partial(_store_processed_image, ticket_id, raw_name))
+
+
+def _store_processed_image(ticket_id: int, raw_name: str, future: Future):
+    """
+    Save the variants of the image and point the ticket at them, in place of its raw image.
+
+    The ticket is only updated if it still has the same raw image: if it has been deleted or
+    its image has been changed meanwhile, the variants are discarded.
+    """
+    ticket_model = apps.get_model("tickets", "Ticket")
+    image_blob_model = apps.get_model("tickets", "ImageBlob")
+    storage = ticket_model._meta.get_field("image").storage
+
+    # callbacks run in a pool thread, which has its own database connection
+    close_old_connections()
+    try:
+        try:
+            raw_digest, variants = future.result()
+        except Exception as error:
+            logger.error(f"Error processing image of ticket {ticket_id}: {error}")
+            # if failed keep original file
+            ticket_model.objects.filter(pk=ticket_id, image=raw_name).update(
+                image_status=ticket_model.ImageStatus.READY, time_edited=timezone.now()
+            )
+            return
+
+        blob = image_blob_model.objects.store(variants, raw_digest)
+
+        # update() skips auto_now, time_edited is set so the cached rendering of the ticket is refreshed
+        updated = ticket_model.objects.filter(pk=ticket_id, image=raw_name).update(
+            image=blob.name,
+            image_variants=blob.variants,
+            image_status=ticket_model.ImageStatus.READY,
+            time_edited=timezone.now(),
+        )
+        if updated:
+            storage.delete(raw_name)
+        else:
+            image_blob_model.objects.release(blob.name)
+    finally:
+        close_old_connections()
@@ -3,14 +3,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, UpdateView
 
-from litrevu.mixins import UserOwnershipMixin
+from litrevu.mixins import UserOwnershipMixin, WriteTransactionMixin
 
 from .form import CustomTicketForm
 from .models import Ticket
 from .services import TicketReviewService
 
 
-class TicketCreateView(LoginRequiredMixin, CreateView):
+class TicketCreateView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
     model = Ticket
     form_class = CustomTicketForm
     template_name = "tickets/ticket_form.html"
@@ -21,7 +21,7 @@ class TicketCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class TicketUpdateView(LoginRequiredMixin, UserOwnershipMixin, UpdateView):
+class TicketUpdateView(LoginRequiredMixin, UserOwnershipMixin, WriteTransactionMixin, UpdateView):
     model = Ticket
     template_name = "tickets/ticket_form.html"
     form_class = CustomTicketForm
@@ -29,7 +29,7 @@ class TicketUpdateView(LoginRequiredMixin, UserOwnershipMixin, UpdateView):
     success_url = reverse_lazy("feed:user_posts")
 
 
-class TicketDeleteView(LoginRequiredMixin, UserOwnershipMixin, DeleteView):
+class TicketDeleteView(LoginRequiredMixin, UserOwnershipMixin, WriteTransactionMixin, DeleteView):
     model = Ticket
     template_name = "tickets/ticket_confirm_delete.html"
     context_object_name = "ticket"
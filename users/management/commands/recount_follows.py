@@ -0,0 +1,10 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Recompute the following and followers counts of every user from the subscriptions"
+
+    def handle(self, *args, **options):
+        updated = get_user_model().objects.recount_follows()
+        self.stdout.write(self.style.SUCCESS(f"Follow counts of {updated} users recomputed"))
@@ -0,0 +1,258 @@
+import hashlib
+import io
+import itertools
+import random
+import time
+
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from feed.models import Subscription
+from reviews.models import Review
+from tickets.image_processing import render_variants
+from tickets.models import ImageBlob, Ticket
+from users.models import User
+
+
+# vocabulary of the generated titles and contents
+VOCABULARY = (
+    "book novel story author reader chapter page cover plot character hero villain world city night day war love "
+    "death life time family friend journey secret mystery history future past dream memory letter island sea "
+    "mountain forest river king queen child mother father brother sister house garden road train ship star "
+    "light shadow fire water stone glass silver gold blood heart mind voice silence truth lie fear hope "
+    "classic modern science fiction fantasy poetry essay crime thriller romance comedy tragedy biography "
+    "beautiful dark strange quiet long short slow brilliant boring moving funny sad clever deep simple "
+    "read write recommend enjoy finish discover remember forget lose find wait travel fight escape return"
+)
+WORDS = VOCABULARY.split()
+
+SEED_PASSWORD = "litrevuTest"
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Disable auto_now and auto_now_add on fields, so bulk_create keeps the generated dates."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset (users, power-law follow graph, tickets with and without images, "
+        "reviews) with bulk inserts, to measure performances at a realistic scale"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of users to create")
+        parser.add_argument("--follows", type=float, default=20, help="Mean number of users followed by a user")
+        parser.add_argument(
+            "--popularity",
+            type=float,
+            default=1.1,
+            help="Exponent of the power law of the popularity of users: the higher, the more followers go to a few",
+        )
+        parser.add_argument("--tickets", type=float, default=10, help="Mean number of tickets published by a user")
+        parser.add_argument("--image-ratio", type=float, default=0.2, help="Share of tickets with an image")
+        parser.add_argument("--images", type=int, default=20, help="Number of distinct images used by tickets")
+        parser.add_argument("--review-ratio", type=float, default=0.3, help="Share of tickets with a review")
+        parser.add_argument("--days", type=int, default=365, help="Posts are spread over this number of past days")
+        parser.add_argument("--prefix", default="seed", help="Prefix of the usernames")
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random generator, for reproducible data")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Number of rows inserted by query")
+        parser.add_argument(
+            "--no-rebuild",
+            action="store_true",
+            help="Do not rebuild the timelines, the search index and the follow counts after loading",
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users prefixed by {options['prefix']}_ already exist, choose another --prefix")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.period = timedelta(days=options["days"])
+
+        with transaction.atomic():
+            users_ids = self._step("users", self.create_users, options["users"], options["prefix"])
+            followers_by_user = self._step(
+                "subscriptions", self.create_subscriptions, users_ids, options["follows"], options["popularity"]
+            )
+            images = self._step("images", self.create_images, options["images"])
+            self._step(
+                "tickets and reviews",
+                self.create_posts,
+                users_ids,
+                followers_by_user,
+                images,
+                options["tickets"],
+                options["image_ratio"],
+                options["review_ratio"],
+            )
+
+        if not options["no_rebuild"]:
+            # bulk_create does not send signals: the data derived from posts and subscriptions is rebuilt
+            for command in ("recount_follows", "rebuild_timeline", "rebuild_search_index"):
+                self._step(command, call_command, command, stdout=self.stdout)
+
+    def _step(self, name: str, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.stdout.write(self.style.SUCCESS(f"{name} done in {time.perf_counter() - start:.1f}s"))
+        return result
+
+    def _bulk_create(self, model, objects) -> list:
+        """Insert objects by batches of --batch-size, and return them with their ids."""
+        created = []
+        iterator = iter(objects)
+        while batch := list(itertools.islice(iterator, self.batch_size)):
+            created.extend(model.objects.bulk_create(batch))
+        return created
+
+    def _text(self, min_words: int, max_words: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(min_words, max_words)))
+
+    def _past_time(self):
+        return self.now - self.period * self.rng.random()
+
+    def create_users(self, count: int, prefix: str) -> list[int]:
+        # hashing a password is slow on purpose, every user shares the same hash
+        password = make_password(SEED_PASSWORD)
+        users = self._bulk_create(
+            User,
+            (User(username=f"{prefix}_{number}", password=password, is_active=True) for number in range(count)),
+        )
+        self.stdout.write(f"{len(users)} users created, their password is {SEED_PASSWORD}")
+        return [user.id for user in users]
+
+    def create_subscriptions(self, users_ids: list[int], mean_follows: float, popularity: float) -> dict:
+        """
+        Create a follow graph where both the number of users followed and the number of followers of users
+        follow power laws: most users follow a few users, and a few users are followed by most users.
+
+        :return: The ids of the followers, by id of followed user
+        """
+        # the popularity of a user is 1 / rank^popularity, ranks being shuffled
+        ranked_users_ids = self.rng.sample(users_ids, len(users_ids))
+        cumulative_weights = list(
+            itertools.accumulate(1 / (rank + 1) ** popularity for rank in range(len(ranked_users_ids)))
+        )
+
+        followers_by_user = {user_id: [] for user_id in users_ids}
+
+        def subscriptions():
+            for follower_id in users_ids:
+                # Pareto distribution of shape 2, whose mean is 2
+                follows_count = min(int(mean_follows / 2 * self.rng.paretovariate(2)), len(users_ids) - 1)
+                followed_ids = set()
+                # draws are redundant for popular users, stop after a bounded number of draws
+                draws = self.rng.choices(ranked_users_ids, cum_weights=cumulative_weights, k=follows_count * 3)
+                for followed_id in draws:
+                    if len(followed_ids) == follows_count:
+                        break
+                    if followed_id != follower_id and followed_id not in followed_ids:
+                        followed_ids.add(followed_id)
+                        followers_by_user[followed_id].append(follower_id)
+                        yield Subscription(follower_id=follower_id, followed_id=followed_id)
+
+        count = len(self._bulk_create(Subscription, subscriptions()))
+        self.stdout.write(f"{count} subscriptions created")
+        return followers_by_user
+
+    def create_images(self, count: int) -> list[ImageBlob]:
+        """Draw random images, stored as blobs shared by the tickets with an image."""
+        images = []
+        for _ in range(count):
+            image = Image.new("RGB", (800, 1200), tuple(self.rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(10):
+                x, y = self.rng.randrange(800), self.rng.randrange(1200)
+                box = (x, y, x + self.rng.randrange(1, 400), y + self.rng.randrange(1, 400))
+                draw.rectangle(box, fill=tuple(self.rng.randrange(256) for _ in range(3)))
+
+            with io.BytesIO() as upload:
+                image.save(upload, format="png")
+                raw_digest = hashlib.sha256(upload.getvalue()).hexdigest()
+                images.append(ImageBlob.objects.store(render_variants(upload), raw_digest))
+
+        return images
+
+    def create_posts(
+        self,
+        users_ids: list[int],
+        followers_by_user: dict,
+        images: list[ImageBlob],
+        mean_tickets: float,
+        image_ratio: float,
+        review_ratio: float,
+    ):
+        """Create the tickets of every user, then review a share of them, preferably by followers of their author."""
+        images_uses = dict.fromkeys((image.pk for image in images), 0)
+
+        def tickets():
+            for user_id in users_ids:
+                for _ in range(round(self.rng.expovariate(1 / mean_tickets)) if mean_tickets else 0):
+                    ticket = Ticket(user_id=user_id, title=self._text(2, 8), content=self._text(0, 60))
+                    ticket.time_created = ticket.time_edited = self._past_time()
+                    if images and self.rng.random() < image_ratio:
+                        image = self.rng.choice(images)
+                        images_uses[image.pk] += 1
+                        ticket.image, ticket.image_variants = image.name, image.variants
+                    yield ticket
+
+        def reviews(tickets_batch):
+            for ticket in tickets_batch:
+                if self.rng.random() >= review_ratio:
+                    continue
+                reviewers_ids = followers_by_user[ticket.user_id]
+                reviewer_id = self.rng.choice(reviewers_ids) if reviewers_ids else self.rng.choice(users_ids)
+                if reviewer_id == ticket.user_id:
+                    continue
+
+                review = Review(
+                    user_id=reviewer_id,
+                    ticket_id=ticket.id,
+                    title=self._text(2, 8),
+                    rating=self.rng.randint(0, 5),
+                    content=self._text(0, 120),
+                )
+                # reviewed at a random time between the creation of the ticket and now
+                delay = (self.now - ticket.time_created) * self.rng.random()
+                review.time_created = review.time_edited = ticket.time_created + delay
+                yield review
+
+        tickets_count = reviews_count = 0
+        timestamps = [
+            model._meta.get_field(name) for model in (Ticket, Review) for name in ("time_created", "time_edited")
+        ]
+        with explicit_timestamps(*timestamps):
+            iterator = tickets()
+            # reviews of a batch of tickets are created before the next batch, so tickets are not kept in memory
+            while tickets_batch := Ticket.objects.bulk_create(list(itertools.islice(iterator, self.batch_size))):
+                tickets_count += len(tickets_batch)
+                reviews_count += len(self._bulk_create(Review, reviews(tickets_batch)))
+
+        # ImageBlob.objects.store() has taken one reference on each image, replace it by the tickets using it
+        for image in images:
+            uses = images_uses[image.pk]
+            if uses:
+                ImageBlob.objects.filter(pk=image.pk).update(ref_count=F("ref_count") + uses - 1)
+            else:
+                ImageBlob.objects.release(image.name)
+
+        self.stdout.write(f"{tickets_count} tickets and {reviews_count} reviews created")
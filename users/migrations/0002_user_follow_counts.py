@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:04
+
+import users.models
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counts(apps, schema_editor):
+    """Count the existing subscriptions of every user."""
+    User = apps.get_model("users", "User")
+    Subscription = apps.get_model("feed", "Subscription")
+
+    def count(field):
+        subscriptions = Subscription.objects.filter(**{field: OuterRef("pk")}).order_by().values(field).annotate(count=Count("*")).values("count")
+        return Coalesce(Subquery(subscriptions), Value(0))
+
+    User.objects.update(following_count=count("follower"), followers_count=count("followed"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_feedentry'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.FollowCountUserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Followers count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Following count'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
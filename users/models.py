@@ -1,28 +1,66 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
 from feed.models import Subscription
 
 
+class FollowCountUserManager(UserManager):
+    def update_follow_counts(self, follower_id: int, followed_id: int, delta: int):
+        """Add delta to the following count of follower and to the followers count of followed, in the database."""
+        # counters never go below zero, even if they have drifted
+        self.filter(pk=follower_id, following_count__gte=-delta).update(following_count=F("following_count") + delta)
+        self.filter(pk=followed_id, followers_count__gte=-delta).update(followers_count=F("followers_count") + delta)
+
+    def recount_follows(self) -> int:
+        """Recompute the follow counts of every user from the Subscription table, return the number of users."""
+
+        def count(field: str) -> Coalesce:
+            subscriptions = (
+                Subscription.objects.filter(**{field: OuterRef("pk")})
+                .order_by()
+                .values(field)
+                .annotate(count=Count("*"))
+                .values("count")
+            )
+            return Coalesce(Subquery(subscriptions), Value(0))
+
+        return self.update(following_count=count("follower"), followers_count=count("followed"))
+
+
 class User(AbstractUser):
+    """
+    :ivar following_count: The number of users followed, kept up to date by the Subscription signals.
+    :type following_count: int
+    :ivar followers_count: The number of followers, kept up to date by the Subscription signals.
+    :type followers_count: int
+    """
+
     bio = models.TextField(blank=True)
+    following_count = models.PositiveIntegerField("Following count", default=0)
+    followers_count = models.PositiveIntegerField("Followers count", default=0)
+
+    objects = FollowCountUserManager()
 
     def follow(self, user: "User"):
-        Subscription.objects.get_or_create(follower=self, followed=user)
+        with transaction.atomic():
+            Subscription.objects.get_or_create(follower=self, followed=user)
+        self._refresh_follow_counts(user)
 
     def unfollow(self, user: "User"):
-        Subscription.objects.filter(follower=self, followed=user).delete()
+        with transaction.atomic():
+            Subscription.objects.filter(follower=self, followed=user).delete()
+        self._refresh_follow_counts(user)
 
-    def check_if_following(self, user):
-        return Subscription.objects.filter(follower=self, followed=user).exists()
+    def _refresh_follow_counts(self, user: "User"):
+        # the counters are updated in the database by the Subscription signals
+        self.refresh_from_db(fields=["following_count", "followers_count"])
+        user.refresh_from_db(fields=["following_count", "followers_count"])
 
-    @property
-    def following_count(self):
-        return self.following.count()
-
-    @property
-    def followers_count(self):
-        return self.followers.count()
+    def check_if_following(self, user):
+        # read from the primary database, not from the cached follow graph: the check guards the unique subscription
+        return Subscription.objects.using(DEFAULT_DB_ALIAS).filter(follower=self, followed=user).exists()
 
     def __str__(self):
         return f"{self.username}"